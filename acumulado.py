@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos, sólo el del proceso
+    fcntl = None
+
+import pandas as pd
+
+from config import DIRECTORIO_CACHE
+from data_loader import optimizar_tipos, preparar_fechas
+from dolor_detector import clasificar_dolores, clasificar_q3_2, filtrar_alerta_match
+from cubo import construir_cubo, sumar_cubos, registrar_cubo
+
+def _normalizar_dni(dni):
+    """DNI como texto; los numéricos enteros sin decimales, así 12345678.0 (Excel) coincide con 12345678."""
+    numeros = pd.to_numeric(dni.astype(object), errors="coerce")
+    enteros = numeros.notna() & (numeros == numeros.round())
+    # map(str) y no astype(str): según la versión de pandas, astype(str) deja los nulos como NaN
+    texto = dni.astype(object).where(dni.notna(), "").map(str).str.strip()
+    return texto.mask(enteros, numeros[enteros].astype("int64").astype(str))
+
+
+def claves_encuesta(df):
+    """
+    Clave de deduplicación de cada encuesta: DNI + Fecha. Las filas sin DNI o
+    sin Fecha no tienen clave (NaN): no hay con qué identificarlas.
+    """
+    faltantes = [col for col in ("DNI", "Fecha") if col not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas para deduplicar el acumulado: {faltantes}")
+    dni = _normalizar_dni(df["DNI"])
+    claves = dni + "|" + df["Fecha"].astype(str)
+    return claves.where((dni != "") & df["Fecha"].notna())
+
+
+# Versión del formato guardado (columnas del dataset y dimensiones del cubo). Si cambia,
+# el acumulado guardado no se migra: hay que vaciarlo y volver a anexar los archivos.
+VERSION_FORMATO = 1
+
+
+class ErrorAcumulado(Exception):
+    """El acumulado guardado en disco no se pudo leer."""
+
+
+_SIN_CARGAR = object()
+
+
+class DatasetAcumulado:
+    """
+    Dataset local que crece mes a mes: cada archivo nuevo se deduplica contra
+    lo ya acumulado (DNI + Fecha; las filas sin alguno de los dos se agregan tal cual), sólo se clasifican las filas nuevas y el
+    cubo de agregados (cubo.construir_cubo) se actualiza sumando el de esas filas.
+    Se guarda en disco (pickle) para sobrevivir a reinicios del servidor; cada
+    archivo se reemplaza de forma atómica y un archivo de lock ordena a los
+    procesos que lo comparten (el tablero y cli.py --acumulado). Un acumulado
+    guardado con otro VERSION_FORMATO no se migra: se pide vaciarlo.
+    """
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self._lock = threading.Lock()
+        # Marca de tiempo de archivos.json con la que se cargó el estado en memoria:
+        # si otro proceso (por ejemplo cli.py --acumulado) lo actualiza, se recarga
+        self._version = _SIN_CARGAR
+        self.df = None
+        self.agregados = None
+        self.archivos = []
+
+    def _ruta(self, nombre):
+        return os.path.join(self.directorio, nombre)
+
+    def _version_en_disco(self):
+        try:
+            return os.stat(self._ruta("archivos.json")).st_mtime_ns
+        except OSError:
+            return None
+
+    @contextmanager
+    def _bloqueado(self, exclusivo):
+        """Lock del proceso y, con fcntl, lock compartido/exclusivo sobre 'acumulado.lock'."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(self._ruta("acumulado.lock"), "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _cargar(self):
+        version = self._version_en_disco()
+        if version == self._version:
+            return
+        self.df, self.agregados, self.archivos = None, None, []
+        if version is not None and os.path.exists(self._ruta("dataset.pkl")):
+            try:
+                df = pd.read_pickle(self._ruta("dataset.pkl"))
+                agregados = pd.read_pickle(self._ruta("agregados.pkl"))
+                with open(self._ruta("archivos.json"), encoding="utf-8") as f:
+                    archivos = json.load(f)
+                formato = self._formato_en_disco()
+            except Exception as e:
+                self._version = _SIN_CARGAR
+                raise ErrorAcumulado(
+                    f"No se pudo leer el acumulado guardado en {self.directorio} ({e}); vacialo para empezar de nuevo."
+                ) from e
+            if formato != VERSION_FORMATO:
+                self._version = _SIN_CARGAR
+                raise ErrorAcumulado(
+                    f"El acumulado guardado en {self.directorio} tiene otro formato "
+                    f"({formato}, se espera {VERSION_FORMATO}); vacialo para empezar de nuevo."
+                )
+            self.df, self.agregados, self.archivos = df, agregados, archivos
+        self._version = version
+
+    def _formato_en_disco(self):
+        """Versión de formato guardada junto a archivos.json (None si el acumulado es anterior)."""
+        if not os.path.exists(self._ruta("formato.json")):
+            return None
+        with open(self._ruta("formato.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _escribir(self, nombre, escribir):
+        """escribir(ruta) sobre un temporal que después reemplaza al archivo: nunca queda uno a medias."""
+        ruta = self._ruta(nombre)
+        temporal = ruta + ".tmp"
+        try:
+            escribir(temporal)
+            os.replace(temporal, ruta)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+
+    def _guardar(self):
+        os.makedirs(self.directorio, exist_ok=True)
+        self._escribir("dataset.pkl", self.df.to_pickle)
+        self._escribir("agregados.pkl", self.agregados.to_pickle)
+
+        def escribir_json(valor):
+            def escribir(ruta):
+                with open(ruta, "w", encoding="utf-8") as f:
+                    json.dump(valor, f)
+            return escribir
+
+        self._escribir("formato.json", escribir_json(VERSION_FORMATO))
+        # archivos.json va último: su marca de tiempo es la versión que ven los demás procesos
+        self._escribir("archivos.json", escribir_json(self.archivos))
+        self._version = self._version_en_disco()
+
+    def obtener(self):
+        """Copia liviana del dataset acumulado (o None si está vacío)."""
+        with self._bloqueado(exclusivo=False):
+            self._cargar()
+            if self.df is None:
+                return None
+            df = self.df.copy(deep=False)
+            # Identifica al dataset para los índices que se arman una vez por dataset (filtros,
+            # búsqueda): todos los archivos y la versión en disco, porque vaciar y volver a
+            # anexar puede repetir la cantidad y el último archivo con otras filas
+            contenido = json.dumps([self.archivos, self._version]).encode("utf-8")
+            df.attrs["clave_dataset"] = "acumulado:" + hashlib.sha1(contenido).hexdigest()
+            # El cubo ya está al día: se registra para que no haya que recalcularlo
+            registrar_cubo(df.attrs["clave_dataset"], self.agregados)
+            return df
+
+    def contiene_archivo(self, hash_archivo):
+        with self._bloqueado(exclusivo=False):
+            self._cargar()
+            return hash_archivo in self.archivos
+
+    def anexar(self, df_nuevo, hash_archivo):
+        """
+        Agrega al acumulado las encuestas de 'df_nuevo' (tal como sale de
+        cargar_datos) que todavía no estén. Devuelve la cantidad de filas nuevas.
+        """
+        with self._bloqueado(exclusivo=True):
+            self._cargar()
+            claves = claves_encuesta(df_nuevo)
+            nuevas = ~claves.duplicated()
+            if self.df is not None:
+                nuevas &= ~claves.isin(claves_encuesta(self.df).dropna())
+            # Las filas sin clave (sin DNI o sin Fecha) no se deduplican: siempre se agregan
+            nuevas |= claves.isna()
+            df_nuevo = df_nuevo[nuevas]
+
+            if not df_nuevo.empty:
+                df_nuevo = filtrar_alerta_match(clasificar_q3_2(clasificar_dolores(df_nuevo.copy())))
+                self.agregados = sumar_cubos(self.agregados, construir_cubo(df_nuevo))
+                # Al concatenar, las categóricas con categorías distintas pasan a object
+                # y se pierde el orden por fecha
+                self.df = optimizar_tipos(preparar_fechas(pd.concat([self.df, df_nuevo], ignore_index=True)))
+            self.archivos.append(hash_archivo)
+            if self.df is not None:
+                self._guardar()
+            return len(df_nuevo)
+
+    def vaciar(self):
+        with self._bloqueado(exclusivo=True):
+            # archivos.json primero: sin él, los demás procesos ven el acumulado vacío
+            for nombre in ("archivos.json", "dataset.pkl", "agregados.pkl", "formato.json"):
+                if os.path.exists(self._ruta(nombre)):
+                    os.remove(self._ruta(nombre))
+            self.df, self.agregados, self.archivos = None, None, []
+            self._version = None
+
+
+_acumulado_por_defecto = None
+_lock_creacion = threading.Lock()
+
+
+def acumulado_por_defecto():
+    """Acumulado compartido del proceso, en DIRECTORIO_CACHE/acumulado."""
+    global _acumulado_por_defecto
+    with _lock_creacion:
+        if _acumulado_por_defecto is None:
+            _acumulado_por_defecto = DatasetAcumulado(os.path.join(DIRECTORIO_CACHE, "acumulado"))
+    return _acumulado_por_defecto
@@ -1,30 +1,77 @@
 import streamlit as st
 import pandas as pd
-from data_loader import cargar_datos
-from dolor_detector import clasificar_dolores, filtrar_alerta_match
+from pipeline import cargar_archivo, anexar_archivo
+from data_loader import ErrorCargaDatos
+from acumulado import acumulado_por_defecto, ErrorAcumulado
 from visualizaciones import mostrar_nps_general, mostrar_tabla_general, mostrar_contacto_y_resolucion, mostrar_precio_promociones
-from filtros_sidebar import aplicar_filtros
+from filtros_sidebar import aplicar_filtros, filtrar_cubo
+from cubo import obtener_cubo, construir_cubo
+from exportacion import boton_libro_completo
 from streamlit_echarts import st_echarts
+from collections import deque
+from instrumentacion import registrar_ejecucion
+from visualizaciones import mostrar_panel_rendimiento, perfilar_esta_ejecucion, mostrar_perfil
+from contextlib import nullcontext
+from perfilado import capturar_perfil
 
 st.set_page_config(page_title="Dash FLOW S/DECO", layout="wide")
 st.title("📊 Dashboard FLOW S/DECO")
 
-# Subida del archivo Excel
-uploaded_file = st.sidebar.file_uploader("📁 Subí tu archivo Excel", type=["xlsx"])
+# Ejecuciones que guarda el panel de rendimiento por sesión
+HISTORIAL_RENDIMIENTO = 30
 
-if uploaded_file:
-    df = cargar_datos(uploaded_file)
+
+def tablero():
+    # Modo de datos: un archivo suelto o el acumulado de varios meses
+    modo = st.sidebar.radio("🗂️ Modo de datos", ["Archivo único", "Acumulado"], horizontal=True)
+
+    # Subida del archivo Excel
+    uploaded_file = st.sidebar.file_uploader("📁 Subí tu archivo Excel", type=["xlsx"])
+
+    df = None
+    if modo == "Acumulado":
+        acumulado = acumulado_por_defecto()
+        if uploaded_file and st.sidebar.button("➕ Agregar al acumulado"):
+            try:
+                nuevas = anexar_archivo(uploaded_file)
+            except (ErrorCargaDatos, ErrorAcumulado, ValueError) as e:
+                # ValueError: al archivo le faltan las columnas para deduplicar (DNI, Fecha)
+                st.error(f"❌ {e}")
+                nuevas = None
+            if nuevas is not None:
+                st.sidebar.success(f"✅ Se agregaron {nuevas} encuestas nuevas al acumulado.")
+        if st.sidebar.button("🗑️ Vaciar acumulado"):
+            acumulado.vaciar()
+        try:
+            df = acumulado.obtener()
+        except ErrorAcumulado as e:
+            st.error(f"❌ {e}")
+    elif uploaded_file:
+        # Carga + clasificación de dolores y maltrato, cacheadas por contenido del archivo
+        try:
+            df = cargar_archivo(uploaded_file)
+        except ErrorCargaDatos as e:
+            st.error(f"❌ {e}")
 
     if df is not None and not df.empty:
-        # Guardar el DataFrame original sin filtrar
-        df_original = df.copy()
+        # DataFrame sin filtrar (mostrar_precio_promociones lo recibe como referencia)
+        df_original = df
 
-        # Clasificación de dolores y maltrato solo una vez
-        df = clasificar_dolores(df)
-        df = filtrar_alerta_match(df)
+        if modo == "Acumulado":
+            with st.expander("📚 Resumen del acumulado (encuestas por Mes y Grupo NPS)"):
+                resumen = acumulado.agregados.assign(
+                    Mes=acumulado.agregados["Mes"].astype(object).fillna("Sin Fecha"),
+                    **{"Grupo NPS": acumulado.agregados["Grupo NPS"].astype(object).fillna("Vacío")},
+                )
+                st.dataframe(resumen.groupby(["Mes", "Grupo NPS"])["Cantidad"].sum().unstack(fill_value=0))
 
         # Aplicar filtros luego del análisis
         df_filtrado = aplicar_filtros(df)
+        # Las tablas de doble entrada salen del cubo de conteos con los mismos filtros; si el
+        # cubo no puede resolverlos (rango que corta meses, Q5.2, Q5.3...) se agregan las filas filtradas
+        cubo_filtrado = filtrar_cubo(obtener_cubo(df), st.session_state.get("filtros_seleccionados", {}))
+        if cubo_filtrado is None:
+            cubo_filtrado = construir_cubo(df_filtrado)
 
         # Recuperar la selección de Grupo NPS hecha en aplicar_filtros (usando session_state)
         seleccion_grupo = st.session_state.get("seleccion_grupo", "Todos")
@@ -33,19 +80,44 @@ if uploaded_file:
             "📊​ NPS General",
             "📋 Análisis de Verbatims",
             "🎯​ Precio y Promociones",
-            
+
         ])
 
         with tab1:
-            mostrar_nps_general(df_filtrado)
+            mostrar_nps_general(df_filtrado, cubo_filtrado)
 
         with tab2:
-            mostrar_tabla_general(df_filtrado)
-            mostrar_contacto_y_resolucion(df_filtrado)
+            mostrar_tabla_general(df_filtrado, cubo_filtrado, df_original)
+            mostrar_contacto_y_resolucion(df_filtrado, cubo_filtrado)
 
         with tab3:
             mostrar_precio_promociones(df_filtrado, df_original, seleccion_grupo)
 
-        
-else:
-    st.info("📄 Esperando que subas un archivo Excel para comenzar.")
+        # Todas las tablas de las pestañas en un solo libro (va al final: usa las tablas ya armadas)
+        st.sidebar.subheader("📦 Exportar todo")
+        boton_libro_completo(
+            etiqueta="📥 Descargar todas las tablas (.xlsx)",
+            nombre_archivo="tablero_flow_completo",
+            contenedor=st.sidebar
+        )
+
+    elif modo == "Acumulado":
+        st.info("📚 El acumulado está vacío: subí un archivo y agregalo para comenzar.")
+    elif not uploaded_file:
+        st.info("📄 Esperando que subas un archivo Excel para comenzar.")
+
+
+# Cada ejecución del script queda registrada por etapas (instrumentacion.py); si se
+# pidió desde el panel de rendimiento, además se perfila con cProfile y tracemalloc
+perfilar = perfilar_esta_ejecucion()
+with registrar_ejecucion() as registro, (capturar_perfil() if perfilar else nullcontext()) as captura:
+    tablero()
+if perfilar:
+    st.session_state["_ultimo_perfil"] = captura
+if "_ultimo_perfil" in st.session_state:
+    mostrar_perfil(st.session_state["_ultimo_perfil"])
+
+historial = st.session_state.setdefault("_historial_rendimiento", deque(maxlen=HISTORIAL_RENDIMIENTO))
+historial.append(registro)
+if st.sidebar.checkbox("⏱️ Panel de rendimiento", key="panel_rendimiento"):
+    mostrar_panel_rendimiento(historial)
@@ -0,0 +1,306 @@
+"""
+Benchmarks del tablero con encuestas sintéticas.
+
+    python benchmark.py --tamanos 10000 100000 --salida benchmark.json
+    python benchmark.py --tamanos 10000 --comparar benchmark_anterior.json
+
+Genera libros con el formato de exportación de Qualtrics (verbatims armados
+con frases de 'dolores' más ruido) y mide la carga, los dos detectores de
+dolor, los filtros, las tablas de doble entrada y las exportaciones. El
+resultado queda en JSON para comparar versiones: con --comparar se marcan las
+etapas que empeoraron más que --tolerancia. También falla si el cubo de conteos
+no agrega (ver chequear_cubo).
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data_loader import cargar_datos, optimizar_tipos
+from dolores_keywords import dolores, LEXICON
+import utils
+import dolor_detector
+from dolor_detector import clasificar_dolores, filtrar_alerta_match, detectar_dolores_batch, estadisticas_cache_dolores
+from escritores import FORMATOS, escribir_xlsx
+import cubo as cubo_encuesta
+from filtros_sidebar import MotorFiltros, aplicar_filtros, filtrar_cubo, filtrar_filas
+
+COL_Q13 = "¿Cuál es el motivo de tu calificación?"
+
+# Palabras sueltas, signos y textos vacíos que se mezclan con las frases clave
+_RUIDO = [
+    "muy", "bueno", "excelente", "nada", "la", "el", "de", "que", "no", "me", "gusta",
+    "anda", "lento", "siempre", "nunca", "ok", "todo", "bien", "mal", "servicio.",
+    "¡Pésimo!", "ATENCION", "técnico", "precio,", "usuario", "123", "...", "😀", "x",
+]
+_VACIOS = ["", " ", "-", "--", "...", "nan", "sin palabras", "ok"]
+
+_OPCIONES = {
+    "Q1.1_NPS_GROUP": ["Promotor", "Pasivo", "Detractor"],
+    "Q2.1": ["Precio", "Contenido", "Calidad de imagen", "Atención al cliente", "Facilidad de uso"],
+    "Q2.2": ["Películas", "Series", "Deportes", "Canales en vivo"],
+    "Q3.1": ["Muy fácil", "Fácil", "Ni fácil ni difícil", "Difícil", "Muy difícil"],
+    "Q3.5": ["Muy buena", "Buena", "Regular", "Mala", "Muy mala"],
+    "Q4.3": ["Sí", "No"],
+    "Q5.1": ["Sí", "No"],
+    "Q5.2": ["Teléfono", "WhatsApp", "Web", "Sucursal"],
+    "Q5.3": ["Sí", "No"],
+    "TECNOLOGIA_FLOW": ["HFC", "FTTH", "COBRE"],
+}
+
+# Segunda fila de la exportación de Qualtrics (cargar_datos la descarta)
+_FILA_ENCABEZADO = {"EndDate": "Fecha de finalización", "Q1.1_NPS_GROUP": "Grupo NPS", "dni": "DNI", "Q1.3": "Motivo"}
+
+
+def _verbatim(rnd, frases):
+    """Entre 0 y 6 fragmentos: frases de 'dolores' (a veces en mayúsculas o con un error de tipeo) y ruido."""
+    if rnd.random() < 0.1:
+        return _VACIOS[rnd.integers(len(_VACIOS))]
+    partes = []
+    for _ in range(rnd.integers(1, 7)):
+        if rnd.random() < 0.4:
+            frase = frases[rnd.integers(len(frases))]
+            if rnd.random() < 0.2:
+                frase = frase.upper()
+            if rnd.random() < 0.15 and len(frase) > 3:
+                i = rnd.integers(len(frase))
+                frase = frase[:i] + frase[i + 1:]
+            partes.append(frase)
+        else:
+            partes.append(_RUIDO[rnd.integers(len(_RUIDO))])
+    return " ".join(partes)
+
+
+def _con_nulos(rnd, valores, proporcion):
+    valores = valores.astype(object)
+    valores[rnd.random(len(valores)) < proporcion] = None
+    return valores
+
+
+def generar_encuestas(filas, semilla=0):
+    """DataFrame con las columnas y la fila de encabezado repetida de una exportación de Qualtrics."""
+    rnd = np.random.default_rng(semilla)
+    frases = [frase for lista in dolores.values() for frase in lista]
+    inicio = pd.Timestamp("2024-01-01").value // 10**9
+    segundos = np.sort(rnd.integers(inicio, inicio + 180 * 86400, filas))
+    df = pd.DataFrame({
+        "StartDate": "",
+        "EndDate": pd.to_datetime(segundos, unit="s").strftime("%Y-%m-%d %H:%M:%S"),
+        "dni": rnd.integers(10**7, 5 * 10**7, filas),
+        "Q1.1": rnd.integers(0, 11, filas),
+        "Q1.3": [_verbatim(rnd, frases) for _ in range(filas)],
+    })
+    for codigo, opciones in _OPCIONES.items():
+        df[codigo] = _con_nulos(rnd, np.array(opciones, dtype=object)[rnd.integers(len(opciones), size=filas)], 0.05)
+    # Q3.2 sólo la contestan algunos
+    df["Q3.2"] = [_verbatim(rnd, frases) if rnd.random() < 0.3 else None for _ in range(filas)]
+    return pd.concat([pd.DataFrame([_FILA_ENCABEZADO]), df], ignore_index=True)[df.columns]
+
+
+def generar_libro(filas, ruta, semilla=0):
+    escribir_xlsx(ruta, [("Encuesta", generar_encuestas(filas, semilla), False)])
+
+
+def _libro_para(filas, directorio, semilla):
+    """El libro sintético se genera una vez por tamaño y semilla y se reutiliza entre corridas."""
+    ruta = os.path.join(directorio, f"encuesta_{filas}_{semilla}.xlsx")
+    if not os.path.exists(ruta):
+        inicio = time.perf_counter()
+        generar_libro(filas, ruta, semilla)
+        print(f"  libro sintético de {filas} filas generado en {time.perf_counter() - inicio:.1f}s", file=sys.stderr)
+    return ruta
+
+
+class Medidor:
+    def __init__(self, repeticiones):
+        self.repeticiones = repeticiones
+        self.resultados = {}
+
+    def medir(self, nombre, funcion, repeticiones=None, filas=None):
+        """
+        Corre 'funcion' varias veces; guarda el mejor tiempo y la media (y, si la
+        etapa consultó el cache de clasificación, sus hits y misses) y devuelve el
+        último resultado.
+        """
+        cache_antes = estadisticas_cache_dolores()
+        tiempos = []
+        for _ in range(repeticiones or self.repeticiones):
+            inicio = time.perf_counter()
+            resultado = funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        self.resultados[nombre] = {"segundos": min(tiempos), "media": sum(tiempos) / len(tiempos), "repeticiones": len(tiempos)}
+        if filas is not None:
+            self.resultados[nombre]["filas"] = filas
+        cache = estadisticas_cache_dolores()
+        hits, misses = cache.hits - cache_antes.hits, cache.misses - cache_antes.misses
+        detalle = ""
+        if hits or misses:
+            self.resultados[nombre]["cache_dolores"] = {"hits": hits, "misses": misses, "tamano": cache.currsize}
+            detalle = f"  (cache: {hits} hits, {misses} misses)"
+        print(f"  {nombre:<40} {min(tiempos):9.3f}s{detalle}", file=sys.stderr, flush=True)
+        return resultado
+
+
+def _en_frio():
+    """Vacía los caches en memoria de la clasificación para medir sin resultados previos."""
+    dolor_detector._categoria_cacheada.cache_clear()
+    utils.detector_compilado._por_token.clear()
+
+
+def correr(filas, args):
+    print(f"[{filas} filas]", file=sys.stderr)
+    medidor = Medidor(args.repeticiones)
+    ruta = _libro_para(filas, args.directorio, args.semilla)
+
+    # Carga y clasificación (el cache en disco de clasificaciones no se usa: siempre en frío)
+    df = medidor.medir("carga.cargar_datos", lambda: cargar_datos(ruta), repeticiones=1, filas=filas)
+    _en_frio()
+    medidor.medir("clasificacion.clasificar_dolores", lambda: clasificar_dolores(df.copy(), usar_cache_disco=False, procesos=1), repeticiones=1)
+    medidor.medir("clasificacion.cache_caliente", lambda: clasificar_dolores(df.copy(), usar_cache_disco=False, procesos=1))
+    df = optimizar_tipos(filtrar_alerta_match(clasificar_dolores(df, usar_cache_disco=False, procesos=1)))
+    df.attrs["clave_dataset"] = f"benchmark:{filas}:{args.semilla}"
+
+    # Los dos detectores fila por fila, sobre una muestra
+    muestra = df[COL_Q13].head(args.muestra_detector).tolist()
+    _en_frio()
+    medidor.medir("detector.utils.detectar_dolor", lambda: [utils.detectar_dolor(v) for v in muestra], repeticiones=1, filas=len(muestra))
+    medidor.medir("detector.dolor_detector.detectar_dolor", lambda: [dolor_detector.detectar_dolor(v) for v in muestra], repeticiones=1, filas=len(muestra))
+    _en_frio()
+    medidor.medir("detector.detectar_dolores_batch", lambda: detectar_dolores_batch(df[COL_Q13]), repeticiones=1)
+
+    # Filtros: con la barra lateral en sus valores por defecto y con una selección fija
+    medidor.medir("filtros.motor", lambda: MotorFiltros(df))
+    medidor.medir("filtros.aplicar_filtros", lambda: aplicar_filtros(df))
+    meses = sorted(df["Mes"].dropna().unique())
+    selecciones = {
+        "Mes": meses[len(meses) // 4:3 * len(meses) // 4 + 1],
+        "Grupo NPS": ["Detractor", "Pasivo"],
+        "Dolor": list(dolor_detector.ETIQUETAS_DOLOR[:3]),
+        cubo_encuesta.COL_Q51: ["Sí"],
+    }
+    filtrado = medidor.medir("filtros.seleccion", lambda: filtrar_filas(df, selecciones))
+
+    # Tablas de doble entrada: desde el cubo y, como referencia, con pd.crosstab
+    cubo = medidor.medir("tablas.construir_cubo", lambda: cubo_encuesta.construir_cubo(df))
+    cubo_filtrado = medidor.medir("tablas.filtrar_cubo", lambda: filtrar_cubo(cubo, selecciones))
+    # Filtros que el cubo no resuelve (rango que corta meses, Q5.2...): se agregan las filas filtradas
+    medidor.medir("tablas.cubo_de_filas_filtradas", lambda: cubo_encuesta.construir_cubo(filtrado))
+    for nombre in ("tabla_q21_por_nps", "tabla_dolor_por_mes", "tabla_q31_por_mes", "tabla_q51_por_mes"):
+        funcion = getattr(cubo_encuesta, nombre)
+        medidor.medir(f"tablas.{nombre}", lambda: funcion(cubo_filtrado))
+    medidor.medir("tablas.crosstab_pandas.dolor_por_mes", lambda: pd.crosstab(filtrado["Dolor"], filtrado["Mes"]))
+    print(f"  {'filas del cubo':<40} {len(cubo):9d} ({len(cubo) / filas:.0%} de las encuestas)", file=sys.stderr)
+
+    # Exportaciones de la tabla de verbatims filtrada (columnas internas afuera)
+    tabla = filtrado[[c for c in filtrado.columns if not c.startswith("_")]]
+    hojas = [
+        ("Verbatims", tabla, False),
+        ("Dolor por Mes", cubo_encuesta.tabla_dolor_por_mes(cubo_filtrado), True),
+        ("Q5.1 por Mes", cubo_encuesta.tabla_q51_por_mes(cubo_filtrado), True),
+    ]
+    with tempfile.TemporaryDirectory() as temporal:
+        for etiqueta, (extension, _, escribir) in FORMATOS.items():
+            ruta_salida = os.path.join(temporal, f"verbatims.{extension}")
+            medidor.medir(f"exportacion.{extension}", lambda: escribir(ruta_salida, tabla, False), repeticiones=1, filas=len(tabla))
+        medidor.medir("exportacion.libro_completo", lambda: escribir_xlsx(os.path.join(temporal, "completo.xlsx"), hojas), repeticiones=1)
+
+    return {"filas": filas, "filas_cubo": len(cubo), "resultados": medidor.resultados}
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Por debajo de este tiempo el ruido de medición domina: no se marcan regresiones
+_MINIMO_COMPARABLE = 0.05
+
+# El cubo tiene que agregar: desde este tamaño, sus filas no pueden pasar de
+# esta proporción de las encuestas. Las respuestas sintéticas son independientes
+# (unas 190.000 combinaciones posibles), así que con menos encuestas casi todas
+# son combinaciones únicas
+MIN_FILAS_CHEQUEO_CUBO = 50_000
+PROPORCION_MAXIMA_CUBO = 0.5
+
+
+def chequear_cubo(corridas):
+    """Cantidad de corridas en las que el cubo no agrega (tiene casi tantas filas como encuestas)."""
+    fallas = 0
+    for corrida in corridas:
+        if corrida["filas"] >= MIN_FILAS_CHEQUEO_CUBO and corrida["filas_cubo"] > PROPORCION_MAXIMA_CUBO * corrida["filas"]:
+            print(f"  ⚠️ [{corrida['filas']}] el cubo tiene {corrida['filas_cubo']} filas: no está agregando", file=sys.stderr)
+            fallas += 1
+    return fallas
+
+
+def comparar(actual, anterior, tolerancia):
+    """Imprime la relación de tiempos contra una corrida anterior; devuelve la cantidad de regresiones."""
+    previas = {corrida["filas"]: corrida["resultados"] for corrida in anterior["corridas"]}
+    regresiones = 0
+    print(f"Comparación contra {anterior.get('commit') or '?'} ({anterior.get('fecha')}):")
+    for corrida in actual["corridas"]:
+        previa = previas.get(corrida["filas"], {})
+        for nombre, resultado in corrida["resultados"].items():
+            if nombre not in previa or not previa[nombre]["segundos"]:
+                continue
+            relacion = resultado["segundos"] / previa[nombre]["segundos"]
+            marca = ""
+            if relacion > 1 + tolerancia and resultado["segundos"] >= _MINIMO_COMPARABLE:
+                marca = "  ⚠️ regresión"
+                regresiones += 1
+            print(f"  [{corrida['filas']}] {nombre:<40} {previa[nombre]['segundos']:9.3f}s → {resultado['segundos']:9.3f}s  x{relacion:.2f}{marca}")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del tablero con encuestas sintéticas.")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10_000, 100_000], help="Filas de cada libro (ej.: 10000 100000 1000000)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--repeticiones", type=int, default=3, help="Repeticiones de las etapas rápidas")
+    parser.add_argument("--muestra-detector", type=int, default=20_000, help="Verbatims para los detectores fila por fila")
+    parser.add_argument("--directorio", default=os.path.join(tempfile.gettempdir(), "tablero_benchmark"), help="Donde se guardan los libros sintéticos")
+    parser.add_argument("--salida", default="benchmark.json", help="Archivo JSON con los resultados")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Empeoramiento relativo que se marca como regresión")
+    args = parser.parse_args(argv)
+
+    # Fuera de 'streamlit run' los widgets de aplicar_filtros devuelven sus valores por defecto;
+    # los avisos de Streamlit por correr sin servidor no aportan nada acá
+    logging.disable(logging.WARNING)
+
+    os.makedirs(args.directorio, exist_ok=True)
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "lexicon": LEXICON.version,
+        "corridas": [correr(filas, args) for filas in args.tamanos],
+    }
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"Resultados en {args.salida}", file=sys.stderr)
+
+    fallas = chequear_cubo(informe["corridas"])
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            fallas += comparar(informe, json.load(f), args.tolerancia)
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from texto import normalizar_serie
+
+
+class IndiceBusqueda:
+    """
+    Índice invertido token → filas sobre textos ya normalizados (texto.normalizar_texto).
+    Resuelve la búsqueda por palabras clave de la tabla de verbatims con la misma
+    semántica que comparar 'consulta in texto_normalizado' fila por fila:
+    - Cada token de la consulta tiene que estar contenido en algún token del
+      texto: los candidatos salen de unir las listas de los tokens del
+      vocabulario que lo contienen (substring, no sólo prefijo) e intersectar
+      entre tokens de la consulta.
+    - Con varios tokens, la frase completa se verifica sólo sobre los candidatos.
+    - Con 'palabra_completa', cada token tiene que coincidir exactamente.
+    """
+
+    def __init__(self, textos_normalizados):
+        self.textos = textos_normalizados.to_numpy(dtype=object)
+        self.n = len(self.textos)
+        tokens = pd.Series(self.textos).str.split().explode().dropna()
+        codigos, vocabulario = pd.factorize(tokens)
+        filas = tokens.index.to_numpy()[np.argsort(codigos, kind="stable")]
+        # Listas de filas en formato CSR: las del token k son filas[inicio[k]:inicio[k + 1]]
+        self._filas = filas
+        self._inicio = np.concatenate(([0], np.cumsum(np.bincount(codigos, minlength=len(vocabulario)))))
+        self._vocabulario = pd.Series(vocabulario, dtype=object)
+        self._posicion = {token: k for k, token in enumerate(vocabulario)}
+
+    @classmethod
+    def desde_textos(cls, serie):
+        """Normaliza la columna y arma el índice. Los nulos se buscan como "nan", igual que antes."""
+        # astype(str) deja los nulos como NaN según la versión de pandas; map(str) los vuelve "nan"
+        return cls(normalizar_serie(serie.astype(str).map(str)))
+
+    def _marcar(self, codigos_tokens, mascara):
+        for k in codigos_tokens:
+            mascara[self._filas[self._inicio[k]:self._inicio[k + 1]]] = True
+        return mascara
+
+    def _filas_con_token(self, token, palabra_completa):
+        mascara = np.zeros(self.n, dtype=bool)
+        if palabra_completa:
+            k = self._posicion.get(token)
+            return mascara if k is None else self._marcar([k], mascara)
+        contienen = np.flatnonzero(self._vocabulario.str.contains(token, regex=False).to_numpy())
+        return self._marcar(contienen, mascara)
+
+    def _filas_con_consulta(self, consulta, palabra_completa):
+        if not consulta:
+            # Una consulta que queda vacía al normalizar está contenida en cualquier texto
+            return np.ones(self.n, dtype=bool)
+        tokens = consulta.split()
+        candidatas = self._filas_con_token(tokens[0], palabra_completa)
+        for token in tokens[1:]:
+            candidatas &= self._filas_con_token(token, palabra_completa)
+        if len(tokens) > 1:
+            if palabra_completa:
+                buscada = f" {consulta} "
+                coincide = [buscada in f" {self.textos[i]} " for i in np.flatnonzero(candidatas)]
+            else:
+                coincide = [consulta in self.textos[i] for i in np.flatnonzero(candidatas)]
+            candidatas[np.flatnonzero(candidatas)] = coincide
+        return candidatas
+
+    def buscar(self, consultas, palabra_completa=False):
+        """
+        Máscara de filas que contienen alguna de las consultas (ya normalizadas
+        con texto.normalizar_texto), como unión de los resultados de cada una.
+        """
+        mascara = np.zeros(self.n, dtype=bool)
+        for consulta in consultas:
+            mascara |= self._filas_con_consulta(consulta, palabra_completa)
+        return mascara
@@ -0,0 +1,91 @@
+import hashlib
+import os
+import sqlite3
+
+from config import DIRECTORIO_CACHE
+
+# Límite de parámetros por consulta de SQLite (se consulta en lotes)
+_LOTE_SQLITE = 900
+
+
+def hash_texto(texto):
+    """Hash corto y estable del texto normalizado (clave del cache)."""
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).digest()
+
+
+class CacheClasificacion:
+    """
+    Cache persistente en SQLite: (hash del texto normalizado, versión del léxico) → categoría.
+    Si cambia una frase de 'dolores' cambia la versión del léxico, así que las
+    entradas viejas dejan de coincidir y se purgan al abrir el cache.
+    Cualquier error de disco desactiva el cache en vez de cortar la clasificación.
+    """
+
+    def __init__(self, ruta, version):
+        self.ruta = ruta
+        self.version = version
+        self.activo = True
+        try:
+            os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+            with self._conectar() as conexion:
+                conexion.execute(
+                    "CREATE TABLE IF NOT EXISTS clasificacion ("
+                    " texto_hash BLOB NOT NULL,"
+                    " version TEXT NOT NULL,"
+                    " categoria TEXT NOT NULL,"
+                    " PRIMARY KEY (texto_hash, version)"
+                    ") WITHOUT ROWID"
+                )
+                conexion.execute("DELETE FROM clasificacion WHERE version != ?", (version,))
+        except (OSError, sqlite3.Error):
+            self.activo = False
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=30)
+
+    def obtener(self, hashes):
+        """Devuelve {hash: categoría} para los hashes ya clasificados con esta versión."""
+        encontrados = {}
+        if not self.activo or not hashes:
+            return encontrados
+        try:
+            with self._conectar() as conexion:
+                for i in range(0, len(hashes), _LOTE_SQLITE):
+                    lote = hashes[i:i + _LOTE_SQLITE]
+                    marcas = ",".join("?" * len(lote))
+                    filas = conexion.execute(
+                        f"SELECT texto_hash, categoria FROM clasificacion "
+                        f"WHERE version = ? AND texto_hash IN ({marcas})",
+                        (self.version, *lote),
+                    )
+                    encontrados.update(filas)
+        except sqlite3.Error:
+            self.activo = False
+        return encontrados
+
+    def guardar(self, categorias_por_hash):
+        """Guarda {hash: categoría} para la versión actual del léxico."""
+        if not self.activo or not categorias_por_hash:
+            return
+        try:
+            with self._conectar() as conexion:
+                conexion.executemany(
+                    "INSERT OR REPLACE INTO clasificacion (texto_hash, version, categoria) VALUES (?, ?, ?)",
+                    ((h, self.version, c) for h, c in categorias_por_hash.items()),
+                )
+        except sqlite3.Error:
+            self.activo = False
+
+
+_cache_por_defecto = None
+
+
+def cache_por_defecto():
+    """Cache compartido del proceso, ubicado en DIRECTORIO_CACHE."""
+    global _cache_por_defecto
+    if _cache_por_defecto is None:
+        from dolores_keywords import LEXICON
+        _cache_por_defecto = CacheClasificacion(
+            os.path.join(DIRECTORIO_CACHE, "clasificacion.sqlite"), LEXICON.version
+        )
+    return _cache_por_defecto
@@ -0,0 +1,133 @@
+import glob
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from config import DIRECTORIO_CACHE, PRESUPUESTO_CACHE_DATOS_MB
+from escritores import preparar_para_arrow
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    # Sin pyarrow no hay snapshots en disco: se vuelve a leer el Excel
+    pa = None
+    feather = None
+
+_log = logging.getLogger(__name__)
+
+
+def tamano_en_memoria(df):
+    """Bytes ocupados por el DataFrame (incluye el contenido de las columnas de texto)."""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+class CacheDatasets:
+    """
+    Cache en memoria de DataFrames ya cargados y clasificados, compartido por
+    todas las sesiones del servidor. Cuando se supera el presupuesto de memoria
+    se descartan primero los datasets usados hace más tiempo (LRU).
+    """
+
+    def __init__(self, presupuesto_bytes):
+        self.presupuesto_bytes = presupuesto_bytes
+        self._datos = OrderedDict()   # clave → (DataFrame, bytes)
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        """Devuelve una copia liviana del dataset (o None) y lo marca como recién usado."""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            self._datos.move_to_end(clave)
+            # Copia superficial: las columnas que agreguen las vistas no tocan el original
+            return entrada[0].copy(deep=False)
+
+    def guardar(self, clave, df):
+        tamano = tamano_en_memoria(df)
+        with self._lock:
+            if clave in self._datos:
+                self._total -= self._datos.pop(clave)[1]
+            if tamano > self.presupuesto_bytes:
+                return
+            while self._datos and self._total + tamano > self.presupuesto_bytes:
+                _, (_, liberado) = self._datos.popitem(last=False)
+                self._total -= liberado
+            self._datos[clave] = (df, tamano)
+            self._total += tamano
+
+    def uso_bytes(self):
+        return self._total
+
+
+class SnapshotsDisco:
+    """
+    Snapshots columnar (Feather sin comprimir) de los datasets ya procesados,
+    uno por (hash del archivo, versión). Al no estar comprimidos se
+    leen con memory-map, así que recargar un archivo ya visto no parsea el Excel.
+    Las columnas con tipos mezclados (por ejemplo DNI numérico y texto) se
+    guardan como texto. Si igual no se puede convertir a Arrow o hay un error
+    de disco, no se guarda snapshot y queda registrado en el log.
+    """
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.activo = feather is not None
+
+    def _ruta(self, clave):
+        hash_archivo, version = clave
+        return os.path.join(self.directorio, f"{hash_archivo}_{version}.feather")
+
+    def leer(self, clave):
+        ruta = self._ruta(clave)
+        if not self.activo or not os.path.exists(ruta):
+            return None
+        try:
+            return feather.read_table(ruta, memory_map=True).to_pandas()
+        except Exception:
+            return None
+
+    def escribir(self, clave, df):
+        if not self.activo:
+            return
+        ruta = self._ruta(clave)
+        temporal = ruta + ".tmp"
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            feather.write_feather(preparar_para_arrow(df.reset_index(drop=True)), temporal, compression="uncompressed")
+            os.replace(temporal, ruta)
+            # Snapshots del mismo archivo con versiones anteriores ya no sirven
+            for viejo in glob.glob(os.path.join(self.directorio, f"{clave[0]}_*.feather")):
+                if viejo != ruta:
+                    os.remove(viejo)
+        except (OSError, pa.ArrowException) as e:
+            _log.warning("No se guardó el snapshot %s: %s", ruta, e)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+
+_cache_por_defecto = None
+_snapshots_por_defecto = None
+_lock_creacion = threading.Lock()
+
+
+def cache_por_defecto():
+    """Cache compartido del proceso, con el presupuesto de config.PRESUPUESTO_CACHE_DATOS_MB."""
+    global _cache_por_defecto
+    with _lock_creacion:
+        if _cache_por_defecto is None:
+            _cache_por_defecto = CacheDatasets(PRESUPUESTO_CACHE_DATOS_MB * 1024 * 1024)
+    return _cache_por_defecto
+
+
+def snapshots_por_defecto():
+    """Snapshots en DIRECTORIO_CACHE/snapshots."""
+    global _snapshots_por_defecto
+    with _lock_creacion:
+        if _snapshots_por_defecto is None:
+            _snapshots_por_defecto = SnapshotsDisco(os.path.join(DIRECTORIO_CACHE, "snapshots"))
+    return _snapshots_por_defecto
@@ -0,0 +1,151 @@
+"""
+Procesamiento por lotes sin Streamlit: carga → clasificación de dolores →
+alertas de maltrato → agregados, para uno o más Excel de la encuesta.
+
+    python cli.py enero.xlsx febrero.xlsx --salida resultados/ --formato parquet
+
+Por cada archivo escribe el dataset clasificado y, para todos juntos, el cubo de
+conteos y un libro con las tablas resumen. Con --acumulado además suma los
+archivos al dataset acumulado que muestra el tablero (modo "Acumulado"), y
+siempre deja el snapshot en disco para que el tablero abra esos archivos sin
+volver a procesarlos.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+from config import PROCESOS_CLASIFICACION, TAMANO_LOTE_CLASIFICACION
+from data_loader import cargar_datos, optimizar_tipos, ErrorCargaDatos
+from dolor_detector import clasificar_dolores, clasificar_q3_2, filtrar_alerta_match
+from escritores import FORMATOS, escribir_xlsx
+from cubo import (
+    construir_cubo, sumar_cubos, distribucion,
+    tabla_q21_por_nps, tabla_dolor_por_mes, tabla_q31_por_mes, tabla_q51_por_mes,
+)
+from pipeline import clave_archivo
+import cache_datasets
+from acumulado import acumulado_por_defecto, ErrorAcumulado
+from instrumentacion import etapa, registrar_ejecucion
+
+# Formatos de salida por extensión (xlsx, csv.gz, parquet)
+FORMATOS_SALIDA = {extension: escribir for extension, _, escribir in FORMATOS.values()}
+
+
+def informar(mensaje):
+    print(mensaje, file=sys.stderr, flush=True)
+
+
+def informar_etapas(registro):
+    """Etapas de 'registrar_ejecucion' (con las anidadas de carga y clasificación) con su tiempo, filas y memoria."""
+    for medicion in registro.etapas:
+        detalle = ""
+        if medicion.filas_salida is not None:
+            entrada = "" if medicion.filas_entrada is None else f"{medicion.filas_entrada} → "
+            detalle += f", {entrada}{medicion.filas_salida} filas"
+        if medicion.memoria_delta is not None:
+            detalle += f", {medicion.memoria_delta / 2**20:+.1f} MB"
+        informar(f"    {'  ' * medicion.nivel}{medicion.nombre}: {medicion.segundos:.2f}s{detalle}")
+
+
+def procesar(ruta, args):
+    """Procesa un archivo; devuelve su cubo de conteos (o None si no tiene la hoja de la encuesta)."""
+    with open(ruta, "rb") as f:
+        contenido = f.read()
+    clave = clave_archivo(contenido)
+    snapshots = cache_datasets.snapshots_por_defecto()
+
+    df = snapshots.leer(clave)
+    if df is not None:
+        informar(f"    snapshot en disco: {len(df)} encuestas ya clasificadas")
+    else:
+        with etapa("lectura"):
+            df = cargar_datos(io.BytesIO(contenido))
+        if df is None or df.empty:
+            informar("    sin hoja de encuesta o sin filas: se omite")
+            return None
+        informar(f"    {len(df)} encuestas")
+        with etapa("clasificación de dolores"):
+            df = clasificar_dolores(
+                df, usar_cache_disco=not args.sin_cache, procesos=args.procesos, tamano_lote=args.tamano_lote
+            )
+            df = clasificar_q3_2(
+                df, usar_cache_disco=not args.sin_cache, procesos=args.procesos, tamano_lote=args.tamano_lote
+            )
+        with etapa("alertas de maltrato"):
+            df = optimizar_tipos(filtrar_alerta_match(df))
+        snapshots.escribir(clave, df)
+
+    with etapa("escritura del dataset clasificado"):
+        nombre = os.path.splitext(os.path.basename(ruta))[0]
+        salida = os.path.join(args.salida, f"{nombre}_clasificado.{args.formato}")
+        # Las columnas internas (prefijo "_") no se exportan
+        FORMATOS_SALIDA[args.formato](salida, df[[c for c in df.columns if not c.startswith("_")]], False)
+
+    if args.acumulado:
+        acumulado = acumulado_por_defecto()
+        if acumulado.contiene_archivo(clave[0]):
+            informar("    el archivo ya estaba en el acumulado")
+        else:
+            with etapa("acumulado"):
+                # anexar sólo reclasifica las filas nuevas, y esas ya están en el cache de clasificaciones
+                nuevas = acumulado.anexar(df, clave[0])
+            informar(f"    {nuevas} encuestas nuevas en el acumulado")
+
+    with etapa("cubo"):
+        return construir_cubo(df)
+
+
+def escribir_resumen(cubo, args):
+    hojas = [
+        ("Distribución NPS", distribucion(cubo, "Grupo NPS", "Vacío").rename("Porcentaje").to_frame(), True),
+        ("Q2.1 por NPS", tabla_q21_por_nps(cubo), True),
+        ("Dolor por Mes", tabla_dolor_por_mes(cubo), True),
+        ("Q3.1 por Mes", tabla_q31_por_mes(cubo), True),
+        ("Q5.1 por Mes", tabla_q51_por_mes(cubo), True),
+    ]
+    escribir_xlsx(os.path.join(args.salida, "resumen.xlsx"), hojas)
+    FORMATOS_SALIDA[args.formato](os.path.join(args.salida, f"cubo.{args.formato}"), cubo, False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clasifica encuestas de Flow sin abrir el tablero.")
+    parser.add_argument("archivos", nargs="+", help="Excel de la encuesta (.xlsx)")
+    parser.add_argument("--salida", default="salida", help="Directorio de salida (default: salida)")
+    parser.add_argument("--formato", choices=sorted(FORMATOS_SALIDA), default="parquet" if "parquet" in FORMATOS_SALIDA else "csv.gz",
+                        help="Formato del dataset clasificado y del cubo")
+    parser.add_argument("--procesos", type=int, default=PROCESOS_CLASIFICACION, help="Procesos para la clasificación")
+    parser.add_argument("--tamano-lote", type=int, default=TAMANO_LOTE_CLASIFICACION, help="Textos por lote en paralelo")
+    parser.add_argument("--sin-cache", action="store_true", help="No usar el cache persistente de clasificaciones")
+    parser.add_argument("--acumulado", action="store_true", help="Sumar los archivos al dataset acumulado del tablero")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.salida, exist_ok=True)
+    inicio = time.perf_counter()
+    cubos = []
+    errores = 0
+    for i, ruta in enumerate(args.archivos, start=1):
+        informar(f"[{i}/{len(args.archivos)}] {ruta}")
+        try:
+            with registrar_ejecucion() as registro:
+                cubo = procesar(ruta, args)
+        except (ErrorCargaDatos, ErrorAcumulado, ValueError, OSError) as e:
+            informar(f"    ❌ {e}")
+            errores += 1
+            continue
+        finally:
+            informar_etapas(registro)
+        if cubo is not None:
+            cubos.append(cubo)
+
+    if cubos:
+        with registrar_ejecucion() as registro, etapa("tablas resumen"):
+            escribir_resumen(sumar_cubos(*cubos), args)
+        informar_etapas(registro)
+    informar(f"Listo en {time.perf_counter() - inicio:.2f}s: {len(cubos)} archivo(s) procesado(s), {errores} con error → {args.salida}")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
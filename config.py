@@ -0,0 +1,16 @@
+import os
+
+# 📂 Carpeta local para caches y datos persistentes del tablero.
+# Se puede cambiar con la variable de entorno TABLERO_CACHE_DIR.
+DIRECTORIO_CACHE = os.environ.get(
+    "TABLERO_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "tableroflows"),
+)
+
+# ⚙️ Clasificación en paralelo (opcional): cantidad de procesos y textos por lote.
+# Con 1 proceso (valor por defecto) todo corre en serie.
+PROCESOS_CLASIFICACION = int(os.environ.get("TABLERO_PROCESOS", "1"))
+TAMANO_LOTE_CLASIFICACION = int(os.environ.get("TABLERO_TAMANO_LOTE", "5000"))
+
+# 🧠 Memoria máxima (en MB) para los datasets cargados que se mantienen entre reruns
+PRESUPUESTO_CACHE_DATOS_MB = int(os.environ.get("TABLERO_CACHE_DATOS_MB", "1024"))
@@ -0,0 +1,152 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from instrumentacion import medido
+
+COL_Q13 = "¿Cuál es el motivo de tu calificación?"
+COL_Q21 = "¿Cuál fue el factor que más influyó en tu nota?"
+COL_Q31 = "¿Qué tan fácil te resulta usar Flow? Q3.1"
+COL_Q51 = "¿Te contactaste con nuestro centro de atención? Q5.1"
+
+# Dimensiones del cubo: el mes y las columnas de las tablas de doble entrada.
+# Sin la fecha al día ni columnas de poca frecuencia, el tamaño del cubo depende
+# de las combinaciones de respuestas y no de la cantidad de encuestas. Los
+# filtros que el cubo no puede resolver (rangos de fechas que cortan meses, Q5.2,
+# Q5.3...) se responden agregando las filas filtradas (ver filtrar_cubo).
+DIMENSIONES_CUBO = ["Mes", "Grupo NPS", "Dolor", COL_Q21, COL_Q31, COL_Q51]
+
+# Conteos por combinación: encuestas y encuestas con verbatim con contenido
+MEDIDAS_CUBO = ["Cantidad", "_con_verbatim"]
+
+# Respuestas de Q1.3 que no cuentan como verbatim con contenido
+_VERBATIMS_VACIOS = ["", "-", "--"]
+
+
+@medido("construir_cubo")
+def construir_cubo(df):
+    """
+    Cubo de conteos del dataset: una fila por combinación observada de las
+    dimensiones, con la cantidad de encuestas en "Cantidad" y cuántas tienen
+    verbatim con contenido en "_con_verbatim". Es aditivo: el cubo
+    de dos lotes es la suma de sus cubos (ver sumar_cubos).
+    """
+    base = pd.DataFrame({dimension: df[dimension] for dimension in DIMENSIONES_CUBO if dimension in df.columns},
+                        index=df.index)
+    base["Cantidad"] = 1
+    if COL_Q13 in df.columns:
+        base["_con_verbatim"] = (~df[COL_Q13].fillna("").astype(str).str.strip().isin(_VERBATIMS_VACIOS)).astype("int64")
+    else:
+        base["_con_verbatim"] = 0
+    return _agrupar(base)
+
+
+def sumar_cubos(*cubos):
+    return _agrupar(pd.concat([cubo for cubo in cubos if cubo is not None], ignore_index=True))
+
+
+def _agrupar(base):
+    dimensiones = [col for col in base.columns if col not in MEDIDAS_CUBO]
+    return (
+        base.groupby(dimensiones, observed=True, dropna=False, sort=False)[MEDIDAS_CUBO]
+        .sum()
+        .reset_index()
+    )
+
+
+def _etiquetas(serie, relleno):
+    """Valores como object (para ordenar y mostrar), con los nulos reemplazados."""
+    serie = serie.astype(object)
+    return serie if relleno is None else serie.fillna(relleno)
+
+
+def _ordenar(tabla):
+    """Ordena filas y columnas por etiqueta; con tipos mezclados se deja el orden de aparición."""
+    for eje in (0, 1):
+        try:
+            tabla = tabla.sort_index(axis=eje)
+        except TypeError:
+            pass
+    return tabla
+
+
+def tabla_doble_entrada(cubo, filas, columnas, relleno_filas=None, relleno_columnas=None):
+    """
+    Equivalente a pd.crosstab(df[filas], df[columnas]) pero sumando el cubo.
+    Sin relleno, las filas con nulos quedan afuera (igual que crosstab).
+    """
+    base = pd.DataFrame({
+        "filas": _etiquetas(cubo[filas], relleno_filas),
+        "columnas": _etiquetas(cubo[columnas], relleno_columnas),
+        "Cantidad": cubo["Cantidad"],
+    }).dropna(subset=["filas", "columnas"])
+    tabla = _ordenar(base.groupby(["filas", "columnas"], sort=False)["Cantidad"].sum().unstack(fill_value=0))
+    tabla.index.name = filas
+    tabla.columns.name = columnas
+    return tabla.astype("int64")
+
+
+def total_encuestas(cubo):
+    return int(cubo["Cantidad"].sum())
+
+
+def total_con_verbatim(cubo):
+    return int(cubo["_con_verbatim"].sum())
+
+
+def distribucion(cubo, columna, relleno):
+    """Porcentaje de encuestas por valor de 'columna' (como value_counts(normalize=True) * 100)."""
+    conteos = cubo.groupby(_etiquetas(cubo[columna], relleno))["Cantidad"].sum()
+    total = conteos.sum()
+    return (conteos / total * 100).round(2) if total else conteos.astype(float)
+
+
+@medido("tabla_q21_por_nps")
+def tabla_q21_por_nps(cubo):
+    return tabla_doble_entrada(cubo, COL_Q21, "Grupo NPS", "Vacío", "Vacío")
+
+
+@medido("tabla_dolor_por_mes")
+def tabla_dolor_por_mes(cubo):
+    return tabla_doble_entrada(cubo, "Dolor", "Mes", "Sin Dolor Detectado", "Sin Fecha")
+
+
+@medido("tabla_q31_por_mes")
+def tabla_q31_por_mes(cubo):
+    return tabla_doble_entrada(cubo, COL_Q31, "Mes")
+
+
+@medido("tabla_q51_por_mes")
+def tabla_q51_por_mes(cubo):
+    return tabla_doble_entrada(cubo, COL_Q51, "Mes", "Sin Respuesta", "Sin Fecha")
+
+
+# --- Cubos por dataset (se arman una vez por dataset y se comparten entre sesiones) ---
+_MAX_CUBOS = 8
+_cubos = OrderedDict()
+_lock = threading.Lock()
+
+
+def registrar_cubo(clave, cubo):
+    """Guarda un cubo ya calculado (por ejemplo, el que mantiene el acumulado)."""
+    with _lock:
+        _cubos[clave] = cubo
+        _cubos.move_to_end(clave)
+        while len(_cubos) > _MAX_CUBOS:
+            _cubos.popitem(last=False)
+
+
+@medido("obtener_cubo")
+def obtener_cubo(df):
+    """Cubo del dataset completo, identificado por df.attrs["clave_dataset"]."""
+    clave = df.attrs.get("clave_dataset")
+    if clave is not None:
+        with _lock:
+            if clave in _cubos:
+                _cubos.move_to_end(clave)
+                return _cubos[clave]
+    cubo = construir_cubo(df)
+    if clave is not None:
+        registrar_cubo(clave, cubo)
+    return cubo
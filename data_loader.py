@@ -1,58 +1,173 @@
-import streamlit as st
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-from io import BytesIO
-from streamlit_echarts import st_echarts
+import numpy as np
+from openpyxl import load_workbook
+import re
+from instrumentacion import medido
+from utils import preparar_textos
+
+# Renombre de los códigos de Qualtrics a las preguntas que usa el tablero
+COLUMNAS_ENCUESTA = {
+    "EndDate": "Fecha",
+    "Q1.1_NPS_GROUP": "Grupo NPS",
+    "dni": "DNI",
+    "Q1.3": "¿Cuál es el motivo de tu calificación?",
+    "Q2.1": "¿Cuál fue el factor que más influyó en tu nota?",
+    "Q2.2": "¿Cuál de estas opciones influyó más en tu elección?",
+    "Q3.1": "¿Qué tan fácil te resulta usar Flow? Q3.1",
+    "Q3.2": "¿Nos contarías por qué motivo te resultó difícil? Q3.2",
+    "Q3.5": "¿Cómo calificas la relación entre lo que pagas y el servicio que te brindamos?",
+    "Q4.3": "¿Tuviste inconveniente con el servicio?",
+    "Q5.1": "¿Te contactaste con nuestro centro de atención? Q5.1",
+    "Q5.2": "¿A través de que canal/es te contactaste? Q5.2",
+    "Q5.3": "¿Fue resuelto el motivo de tu contacto? Q5.3",
+    "TECNOLOGIA_FLOW": "Tecnlogía"
+}
+
+# Columnas con pocos valores distintos: se guardan como categóricas
+COLUMNAS_CATEGORICAS = [COLUMNAS_ENCUESTA[codigo] for codigo in (
+    "Q1.1_NPS_GROUP", "Q2.1", "Q2.2", "Q3.1", "Q3.5", "Q4.3", "Q5.1", "Q5.2", "Q5.3", "TECNOLOGIA_FLOW"
+)] + ["Dolor", "Dolor_Q3_2", "Maltrato Detectado", "Mes"]
+
+# Columnas de texto libre: se marcan los indefinidos y se prepara su texto al cargar
+COLUMNAS_TEXTO = [COLUMNAS_ENCUESTA["Q1.3"], COLUMNAS_ENCUESTA["Q3.2"]]
+
+class ErrorCargaDatos(Exception):
+    """El archivo no se pudo leer o no tiene el formato de la encuesta."""
+
+
+# Además de las columnas renombradas se leen todas las preguntas Q1.x a Q5.x
+_PATRON_PREGUNTAS = re.compile(r"^Q[1-5]\.")
 
+
+def _es_columna_necesaria(columna):
+    columna = str(columna).strip()
+    return columna in COLUMNAS_ENCUESTA or bool(_PATRON_PREGUNTAS.match(columna))
+
+
+def _es_hoja_encuesta(encabezado):
+    return "¿Cuál es el motivo de tu calificación?" in encabezado or "Q1.3" in encabezado
+
+
+def _buscar_hoja_encuesta(libro):
+    """
+    Lee sólo la fila de encabezados de cada hoja y devuelve
+    (nombre de la hoja de la encuesta, encabezados) o (None, None).
+    """
+    for hoja in libro.worksheets:
+        fila = next(hoja.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        encabezado = [str(celda).strip() for celda in fila if celda is not None]
+        if _es_hoja_encuesta(encabezado):
+            return hoja.title, encabezado
+    return None, None
+
+
+def _leer_hoja_encuesta(excel_file):
+    """
+    Abre el libro una sola vez en modo read-only, ubica la hoja de la encuesta
+    por su encabezado y parsea sólo esa hoja. Con códigos de Qualtrics se leen
+    sólo las columnas que usa el tablero; si la hoja ya trae las preguntas
+    como encabezado se lee completa.
+    """
+    libro = load_workbook(excel_file, read_only=True, data_only=True, keep_links=False)
+    try:
+        nombre_hoja, encabezado = _buscar_hoja_encuesta(libro)
+        if nombre_hoja is None:
+            return None
+        usecols = _es_columna_necesaria if "Q1.3" in encabezado else None
+        return pd.read_excel(libro, sheet_name=nombre_hoja, header=0, usecols=usecols, engine="openpyxl")  # encabezado en la fila 1
+    finally:
+        libro.close()
+
+
+@medido("cargar_datos")
 def cargar_datos(excel_file):
+    """
+    Lee la hoja de la encuesta y la deja lista para clasificar. Devuelve None si
+    el libro no tiene una hoja de encuesta; ante cualquier otro problema lanza
+    ErrorCargaDatos (la interfaz o la línea de comandos deciden cómo mostrarlo).
+    """
     try:
-        df = pd.read_excel(excel_file, sheet_name=None, header=0)  # encabezado en la fila 1
-
-        for nombre_hoja, hoja in df.items():
-            hoja = hoja.copy()
-            hoja.columns = hoja.columns.str.strip()
-
-            if "¿Cuál es el motivo de tu calificación?" in hoja.columns or "Q1.3" in hoja.columns:
-                hoja.rename(columns={
-                    "EndDate": "Fecha",
-                    "Q1.1_NPS_GROUP": "Grupo NPS",
-                    "dni": "DNI",
-                    "Q1.3": "¿Cuál es el motivo de tu calificación?",
-                    "Q2.1": "¿Cuál fue el factor que más influyó en tu nota?",
-                    "Q2.2": "¿Cuál de estas opciones influyó más en tu elección?",
-                    "Q3.1": "¿Qué tan fácil te resulta usar Flow? Q3.1",
-                    "Q3.2": "¿Nos contarías por qué motivo te resultó difícil? Q3.2",
-                    "Q3.5": "¿Cómo calificas la relación entre lo que pagas y el servicio que te brindamos?",
-                    "Q4.3": "¿Tuviste inconveniente con el servicio?",
-                    "Q5.1": "¿Te contactaste con nuestro centro de atención? Q5.1",
-                    "Q5.2": "¿A través de que canal/es te contactaste? Q5.2",
-                    "Q5.3": "¿Fue resuelto el motivo de tu contacto? Q5.3",
-                    "TECNOLOGIA_FLOW": "Tecnlogía"
-                }, inplace=True)
-
-                # Filtrar encabezados repetidos
-                hoja = hoja[hoja["Fecha"] != "Fecha de finalización"]
-
-                hoja.dropna(subset=["¿Cuál es el motivo de tu calificación?"], inplace=True)
-                hoja["verbatim"] = hoja["¿Cuál es el motivo de tu calificación?"]
-
-                
-                # Marcar textos vacíos o con solo símbolos como indefinidos
-                hoja = marcar_indefinidos(hoja, [
-                    "¿Cuál es el motivo de tu calificación?",
-                    "¿Nos contarías por qué motivo te resultó difícil? Q3.2"
-                ])
-
-                return hoja
+        hoja = _leer_hoja_encuesta(excel_file)
+        if hoja is None:
+            return None
 
-        return None
+        hoja.columns = hoja.columns.str.strip()
+        hoja.rename(columns=COLUMNAS_ENCUESTA, inplace=True)
+
+        # Filtrar encabezados repetidos
+        hoja = hoja[hoja["Fecha"] != "Fecha de finalización"]
+        hoja = preparar_fechas(hoja)
+
+        hoja.dropna(subset=["¿Cuál es el motivo de tu calificación?"], inplace=True)
+        hoja["verbatim"] = hoja["¿Cuál es el motivo de tu calificación?"]
+
+
+        # Marcar textos vacíos o con solo símbolos como indefinidos
+        hoja = marcar_indefinidos(hoja, COLUMNAS_TEXTO)
+        # Texto normalizado y con sinónimos, una sola vez para clasificación y búsqueda
+        hoja = preparar_textos(hoja, COLUMNAS_TEXTO)
+
+        return hoja
     except Exception as e:
-        st.error(f"❌ Error al cargar datos: {e}")
-        return None
+        raise ErrorCargaDatos(f"Error al cargar datos: {e}") from e
 
+def _convertir_fechas(valores):
+    """
+    pd.to_datetime infiere un único formato a partir del primer valor; los que
+    no lo siguen (por ejemplo "2024-03-15" después de "2024-01-05 10:00") se
+    vuelven a parsear uno por uno con format="mixed" en vez de quedar NaT.
+    """
+    fechas = pd.to_datetime(valores, errors="coerce")
+    fallidas = fechas.isna() & valores.notna()
+    if fallidas.any():
+        fechas[fallidas] = pd.to_datetime(valores[fallidas], errors="coerce", format="mixed")
+    return fechas
+
+
+def preparar_fechas(df):
+    """
+    Convierte "Fecha" a datetime una sola vez, deriva "Mes" (AAAA-MM) y deja el
+    dataset ordenado por fecha (las fechas inválidas al final), para que los
+    rangos de fechas se resuelvan con búsqueda binaria.
+    """
+    df = df.copy()
+    df["Fecha"] = _convertir_fechas(df["Fecha"])
+    df["Mes"] = df["Fecha"].dt.strftime("%Y-%m")
+    return df.sort_values("Fecha", kind="stable", na_position="last").reset_index(drop=True)
+
+
+def ordenado_por_fecha(fechas):
+    """True si la columna está como la deja preparar_fechas: ascendente y con los nulos al final."""
+    validas = int(fechas.notna().sum())
+    return fechas.iloc[validas:].isna().all() and fechas.iloc[:validas].is_monotonic_increasing
+
+
+def rango_fechas(fechas, inicio, fin):
+    """
+    Posiciones [i, j) de las filas con inicio <= Fecha < fin en una columna de
+    fechas ordenada (con las fechas inválidas al final), por búsqueda binaria.
+    """
+    validas = fechas.to_numpy()[:int(fechas.notna().sum())]
+    i = np.searchsorted(validas, pd.Timestamp(inicio).to_datetime64(), side="left")
+    j = np.searchsorted(validas, pd.Timestamp(fin).to_datetime64(), side="left")
+    return int(i), int(j)
+
+
+def meses_de_rango(fechas, inicio, fin):
+    """
+    Meses ("Mes", AAAA-MM) que abarca el rango inicio <= Fecha < fin, si sus
+    filas son exactamente las de esos meses completos; None si el rango deja
+    afuera filas de algún mes (o si las fechas no están ordenadas).
+    """
+    if not ordenado_por_fecha(fechas):
+        return None
+    inicio, fin = pd.Timestamp(inicio), pd.Timestamp(fin)
+    primer_mes = inicio.to_period("M")
+    ultimo_mes = (fin - pd.Timedelta(1, "ns")).to_period("M")
+    if rango_fechas(fechas, inicio, fin) != rango_fechas(fechas, primer_mes.start_time, (ultimo_mes + 1).start_time):
+        return None
+    return [mes.strftime("%Y-%m") for mes in pd.period_range(primer_mes, ultimo_mes, freq="M")]
 
-import re
 
 def marcar_indefinidos(df, columnas_texto):
     """
@@ -62,5 +177,21 @@ def marcar_indefinidos(df, columnas_texto):
     for col in columnas_texto:
         if col in df.columns:
             df[col] = df[col].fillna("").astype(str)
-            df[col + "_es_indefinido"] = df[col].apply(lambda x: not re.search(r"\w", x))
+            # Como object para que \w sea el de re (Unicode) y no el ASCII de pyarrow
+            df[col + "_es_indefinido"] = ~df[col].astype(object).str.contains(r"\w", regex=True)
+    return df
+
+
+@medido("optimizar_tipos")
+def optimizar_tipos(df):
+    """
+    Representación compacta del dataset, aplicada una sola vez al cargar:
+    columnas de pocos valores distintos como 'category' y banderas como bool.
+    """
+    for col in COLUMNAS_CATEGORICAS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    for col in df.columns:
+        if col.endswith("_es_indefinido"):
+            df[col] = df[col].astype(bool)
     return df
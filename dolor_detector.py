@@ -1,17 +1,15 @@
-import re
-import unicodedata
-from dolores_keywords import dolores
+from dolores_keywords import LEXICON, CATEGORIAS_EXCLUIDAS
+from texto import normalizar_compacto as normalizar_texto, normalizar_serie
+from utils import detector_compilado, expandir_sinonimos_serie, patron_relevante, texto_preparado
 import pandas as pd
-
-def normalizar_texto(texto):
-    texto = str(texto).lower()
-    # Saca tildes/acentos
-    texto = ''.join(
-        c for c in unicodedata.normalize('NFD', texto)
-        if unicodedata.category(c) != 'Mn'
-    )
-    texto = re.sub(r'[^\w\s]', '', texto)  # Saca signos y puntuación
-    return texto.strip()
+import numpy as np
+import multiprocessing
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from cache_clasificacion import cache_por_defecto, hash_texto
+from config import PROCESOS_CLASIFICACION, TAMANO_LOTE_CLASIFICACION
+from instrumentacion import medido
 
 def es_comentario_vacio(texto):
     texto = normalizar_texto(texto)
@@ -22,26 +20,238 @@ def detectar_dolor(verbatim):
     if es_comentario_vacio(verbatim):
         return "Vacío"
     dolores_detectados = []
-    for categoria, frases in dolores.items():
-        if categoria in ["Indefinido", "Vacío"]:
+    for categoria in LEXICON.categorias:
+        if categoria in CATEGORIAS_EXCLUIDAS:
             continue
-        for frase in frases:
-            if normalizar_texto(frase) in verbatim:
-                dolores_detectados.append(categoria)
-                break
+        if any(clave.compacta in verbatim for clave in LEXICON.claves[categoria]):
+            dolores_detectados.append(categoria)
     return ", ".join(dolores_detectados) if dolores_detectados else "Sin Dolor Detectado"
 
-def clasificar_dolores(df):
+# Máximo de textos normalizados distintos que se recuerdan entre llamadas (y reruns)
+TAMANO_CACHE_DOLORES = 100_000
+
+InfoCache = namedtuple("InfoCache", ["hits", "misses", "maxsize", "currsize"])
+
+class _CacheCategorias:
+    """
+    LRU (versión del léxico, texto normalizado) → categoría. A diferencia de
+    functools.lru_cache permite consultar sin clasificar y cargar resultados
+    que vienen de otro lado (cache en disco, procesos): lo que ya está en
+    memoria no se vuelve a buscar en SQLite ni a clasificar.
+    La versión del léxico es parte de la clave: si cambia 'dolores' no se
+    reutilizan resultados viejos.
+    """
+
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def buscar(self, version, textos):
+        """Devuelve ({texto: categoría} de los que están en memoria, [textos que faltan])."""
+        encontrados, faltan = {}, []
+        with self._lock:
+            for texto in textos:
+                categoria = self._entradas.get((version, texto))
+                if categoria is None:
+                    faltan.append(texto)
+                else:
+                    self._entradas.move_to_end((version, texto))
+                    encontrados[texto] = categoria
+            self._hits += len(encontrados)
+            self._misses += len(faltan)
+        return encontrados, faltan
+
+    def guardar(self, version, categorias_por_texto):
+        with self._lock:
+            for texto, categoria in categorias_por_texto.items():
+                self._entradas[(version, texto)] = categoria
+                self._entradas.move_to_end((version, texto))
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+
+    def cache_info(self):
+        return InfoCache(self._hits, self._misses, self.maximo, len(self._entradas))
+
+    def cache_clear(self):
+        with self._lock:
+            self._entradas.clear()
+            self._hits = self._misses = 0
+
+_categoria_cacheada = _CacheCategorias(TAMANO_CACHE_DOLORES)
+
+def estadisticas_cache_dolores():
+    """Hits, misses, tamaño máximo y tamaño actual del cache de clasificación."""
+    return _categoria_cacheada.cache_info()
+
+# Por debajo de esta cantidad de textos a clasificar no conviene levantar procesos
+MIN_TEXTOS_PARALELO = 20_000
+
+# Los procesos arrancan con "spawn": un fork del servidor de Streamlit (con varios
+# hilos) podría copiar locks tomados por otro hilo y quedar colgado
+_CONTEXTO_PROCESOS = multiprocessing.get_context("spawn")
+
+_detector_trabajador = None
+
+def _iniciar_trabajador(detector):
+    # Cada proceso recibe el detector compilado una sola vez, al arrancar
+    global _detector_trabajador
+    _detector_trabajador = detector
+
+def _clasificar_con(detector, textos):
+    return [detector.categoria(texto) or "Sin Dolor Detectado" for texto in textos]
+
+def _clasificar_lote(textos):
+    return _clasificar_con(_detector_trabajador, textos)
+
+def _clasificar_en_paralelo(textos, procesos, tamano_lote):
+    """Reparte los textos en lotes entre 'procesos' y devuelve las categorías en el mismo orden."""
+    lotes = [textos[i:i + tamano_lote] for i in range(0, len(textos), tamano_lote)]
+    with ProcessPoolExecutor(
+        max_workers=procesos, mp_context=_CONTEXTO_PROCESOS,
+        initializer=_iniciar_trabajador, initargs=(detector_compilado,)
+    ) as ejecutor:
+        return [categoria for lote in ejecutor.map(_clasificar_lote, lotes) for categoria in lote]
+
+def _clasificar_textos(textos, cache_disco=None, procesos=1, tamano_lote=TAMANO_LOTE_CLASIFICACION):
+    """
+    Clasifica textos normalizados distintos: primero el cache en memoria, con
+    lo que falta el cache en disco y recién después el detector, en paralelo si
+    se pidieron varios procesos y hay volumen suficiente.
+    """
+    por_texto, pendientes = _categoria_cacheada.buscar(LEXICON.version, textos)
+    desde_disco, hashes = {}, {}
+    if pendientes and cache_disco is not None and cache_disco.activo:
+        hashes = {texto: hash_texto(texto) for texto in pendientes}
+        conocidos = cache_disco.obtener(list(hashes.values()))
+        pendientes = []
+        for texto, h in hashes.items():
+            if h in conocidos:
+                desde_disco[texto] = conocidos[h]
+            else:
+                pendientes.append(texto)
+
+    if procesos > 1 and len(pendientes) >= MIN_TEXTOS_PARALELO:
+        categorias = _clasificar_en_paralelo(pendientes, procesos, tamano_lote)
+    else:
+        categorias = _clasificar_con(detector_compilado, pendientes)
+    nuevos = dict(zip(pendientes, categorias))
+    # Lo clasificado en los procesos también queda en memoria para el próximo rerun
+    _categoria_cacheada.guardar(LEXICON.version, {**desde_disco, **nuevos})
+    por_texto.update(desde_disco)
+    por_texto.update(nuevos)
+
+    if hashes:
+        cache_disco.guardar({hashes[texto]: categoria for texto, categoria in nuevos.items()})
+    return por_texto
+
+def detectar_dolores_batch(serie, cache_disco=None, procesos=1, tamano_lote=TAMANO_LOTE_CLASIFICACION,
+                           sinonimos=None):
+    """
+    Equivalente a aplicar utils.detectar_dolor fila por fila, pero para una
+    columna completa:
+    1) Trabaja sólo sobre los textos distintos (los verbatims se repiten mucho).
+    2) Valida y normaliza con operaciones vectorizadas de pandas.
+    3) Clasifica cada texto normalizado distinto una vez, con cache LRU y,
+       si se pasa 'cache_disco' (CacheClasificacion), reutilizando lo ya
+       clasificado en cargas anteriores. Con 'procesos' > 1 los textos nuevos se
+       clasifican en paralelo (ver MIN_TEXTOS_PARALELO).
+    4) Distribuye el resultado a todas las filas.
+    Si se pasa 'sinonimos' (el texto ya normalizado y con sinónimos de la misma
+    columna, ver utils.preparar_textos) no se vuelve a normalizar.
+    """
+    codigos, unicos = pd.factorize(serie.astype(object))
+    unicos = pd.Series(unicos, dtype=object)
+    es_texto = unicos.map(lambda x: isinstance(x, str))
+    relevante = es_texto & unicos.where(es_texto, "").str.contains(patron_relevante, regex=True)
+
+    if sinonimos is None:
+        normalizadas = expandir_sinonimos_serie(normalizar_serie(unicos[relevante]))
+    else:
+        # Texto preparado de la primera fila con cada valor distinto
+        filas = np.flatnonzero(codigos >= 0)
+        primeras = filas[np.unique(codigos[filas], return_index=True)[1]]
+        normalizadas = pd.Series(sinonimos.to_numpy(dtype=object)[primeras], dtype=object)[relevante]
+    por_texto = _clasificar_textos(pd.unique(normalizadas), cache_disco, procesos, tamano_lote)
+    dolores_unicos = pd.Series("Sin Dolor Detectado", index=unicos.index, dtype=object)
+    dolores_unicos[relevante] = normalizadas.map(por_texto)
+
+    # El último elemento cubre los valores nulos (código -1 de factorize)
+    valores = np.append(dolores_unicos.to_numpy(), "Sin Dolor Detectado").astype(object)
+    return pd.Series(valores[codigos], index=serie.index, dtype=object)
+
+@medido("clasificar_serie")
+def clasificar_serie(serie, usar_cache_disco=True, procesos=PROCESOS_CLASIFICACION,
+                     tamano_lote=TAMANO_LOTE_CLASIFICACION, sinonimos=None):
+    """detectar_dolores_batch con la configuración del tablero (cache en disco y procesos)."""
+    cache_disco = cache_por_defecto() if usar_cache_disco else None
+    return detectar_dolores_batch(serie, cache_disco, procesos, tamano_lote, sinonimos)
+
+@medido("clasificar_dolores")
+def clasificar_dolores(df, usar_cache_disco=True, procesos=PROCESOS_CLASIFICACION,
+                       tamano_lote=TAMANO_LOTE_CLASIFICACION):
     # No invento nada, solo tu lógica original
-    from utils import detectar_dolor
     if 'verbatim' in df.columns:
-        df['Dolor'] = df['verbatim'].apply(detectar_dolor)
+        columna = 'verbatim'
     elif '2 - ¿Cuál es el motivo de tu calificación?' in df.columns:
-        df['Dolor'] = df['2 - ¿Cuál es el motivo de tu calificación?'].apply(detectar_dolor)
+        columna = '2 - ¿Cuál es el motivo de tu calificación?'
     else:
         raise ValueError("No se encuentra la columna de comentarios (verbatim) en el dataframe.")
+    # 'verbatim' es copia de Q1.3 (data_loader.cargar_datos): usa el texto preparado de esa columna
+    origen = '¿Cuál es el motivo de tu calificación?' if columna == 'verbatim' else columna
+    df['Dolor'] = clasificar_serie(df[columna], usar_cache_disco, procesos, tamano_lote,
+                                   sinonimos=texto_preparado(df, origen, "sinonimos"))
+    # Forma compacta para filtrar: un bit por etiqueta (el texto queda para mostrar)
+    df['_dolor_bits'] = codificar_dolores(df['Dolor'])
+    return df
+
+@medido("clasificar_q3_2")
+def clasificar_q3_2(df, usar_cache_disco=True, procesos=PROCESOS_CLASIFICACION,
+                    tamano_lote=TAMANO_LOTE_CLASIFICACION):
+    """Columna 'Dolor_Q3_2': la misma clasificación aplicada al motivo de dificultad (Q3.2)."""
+    columna = '¿Nos contarías por qué motivo te resultó difícil? Q3.2'
+    if columna in df.columns:
+        df['Dolor_Q3_2'] = clasificar_serie(df[columna].fillna("").astype(str), usar_cache_disco, procesos, tamano_lote,
+                                            sinonimos=texto_preparado(df, columna, "sinonimos"))
+    else:
+        df['Dolor_Q3_2'] = "Sin Dato"
     return df
 
+# Etiquetas posibles de "Dolor" (un bit por etiqueta en la columna '_dolor_bits')
+ETIQUETAS_DOLOR = LEXICON.categorias + tuple(
+    etiqueta for etiqueta in ("Vacío", "Sin Dolor Detectado") if etiqueta not in LEXICON.categorias
+)
+if len(ETIQUETAS_DOLOR) > 64:
+    raise ValueError("Hay más de 64 categorías de dolor: no entran en la máscara de bits.")
+_BIT_ETIQUETA = {etiqueta: np.uint64(1) << np.uint64(i) for i, etiqueta in enumerate(ETIQUETAS_DOLOR)}
+
+def codificar_dolores(serie):
+    """
+    Convierte la columna "Dolor" (etiquetas separadas por coma) en un array
+    uint64 con un bit encendido por cada etiqueta de ETIQUETAS_DOLOR.
+    """
+    codigos, unicos = pd.factorize(serie.astype(object))
+    bits_unicos = np.zeros(len(unicos) + 1, dtype=np.uint64)  # el último cubre los nulos
+    for i, valor in enumerate(unicos):
+        for etiqueta in str(valor).split(","):
+            bits_unicos[i] |= _BIT_ETIQUETA.get(etiqueta.strip(), np.uint64(0))
+    return bits_unicos[codigos]
+
+def mascara_dolores(bits, seleccion):
+    """Filas que tienen al menos una de las etiquetas seleccionadas."""
+    mascara = np.uint64(0)
+    for etiqueta in seleccion:
+        mascara |= _BIT_ETIQUETA.get(etiqueta, np.uint64(0))
+    return (np.asarray(bits, dtype=np.uint64) & mascara) != 0
+
+def etiquetas_presentes(bits):
+    """Etiquetas que aparecen en al menos una fila."""
+    presentes = np.bitwise_or.reduce(np.asarray(bits, dtype=np.uint64), initial=np.uint64(0))
+    return [etiqueta for etiqueta, bit in _BIT_ETIQUETA.items() if presentes & bit]
+
+@medido("filtrar_alerta_match")
 def filtrar_alerta_match(df):
     def match_alerta(dolores):
         if pd.isna(dolores):
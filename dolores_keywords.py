@@ -1,3 +1,11 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping
+
+from texto import normalizar_texto, normalizar_compacto, conectores
+
 dolores = {
     "Atención al cliente": [
         "asesor",
@@ -1222,13 +1230,65 @@ dolores = {
     ]
 }
 
-# --- Función para normalizar frases ignorando el orden de las palabras ---
-def normalizar_frase(frase):
-    palabras = frase.lower().split()
-    return " ".join(sorted(palabras))
+# 🔄 Diccionario de sinónimos (clave → lista de sinónimos que se normalizan a esa clave)
+sinonimos = {
+    "facturacion": ["factura", "boleta", "cobro"],
+    "precio":      ["valor", "costo"],
+    "servicio":    ["atencion", "soporte", "ayuda"],
+    "tecnico":     ["tecnica", "tecnologia"],
+    "pago":        ["abono", "deposito"],
+    "cliente":     ["usuario", "abonado"]
+}
+
+
+# --- Léxico precompilado: se construye una sola vez al importar el módulo ---
+# Categorías que los clasificadores no asignan como dolor
+CATEGORIAS_EXCLUIDAS = ("Indefinido", "Vacío")
+
+
+@dataclass(frozen=True)
+class Clave:
+    frase: str          # frase tal como figura en 'dolores'
+    normalizada: str    # texto.normalizar_texto (sin tildes, signos ni conectores)
+    tokens: tuple       # tokens de 'normalizada'
+    compacta: str       # texto.normalizar_compacto (usada por dolor_detector)
+
+
+@dataclass(frozen=True)
+class Lexicon:
+    categorias: tuple   # categorías en el orden de 'dolores'
+    claves: Mapping     # categoría → tuple[Clave], sin duplicados
+    version: str        # hash de 'dolores', 'sinonimos' y 'texto.conectores'
+
+
+def construir_lexicon(dolores_dict, sinonimos_dict, palabras_conectoras):
+    """
+    Normaliza cada frase una única vez, elimina duplicados dentro de cada
+    categoría (conservando el primer orden de aparición) y calcula un hash de
+    versión para invalidar caches. La clasificación también depende de los
+    sinónimos y de los conectores que se quitan al normalizar: entran en el hash.
+    """
+    claves = {}
+    for categoria, frases in dolores_dict.items():
+        vistas = set()
+        lista = []
+        for frase in frases:
+            normalizada = normalizar_texto(frase)
+            compacta = normalizar_compacto(frase)
+            if (normalizada, compacta) in vistas:
+                continue
+            vistas.add((normalizada, compacta))
+            lista.append(Clave(frase, normalizada, tuple(normalizada.split()), compacta))
+        claves[categoria] = tuple(lista)
+
+    contenido = json.dumps(
+        [dolores_dict, sinonimos_dict, sorted(palabras_conectoras)], ensure_ascii=False
+    ).encode("utf-8")
+    return Lexicon(
+        categorias=tuple(dolores_dict),
+        claves=MappingProxyType(claves),
+        version=hashlib.sha256(contenido).hexdigest()[:16],
+    )
+
 
-# --- Diccionario con frases normalizadas (para usar en el tagging) ---
-dolores_normalizados = {
-    dolor: [normalizar_frase(token) for token in tokens]
-    for dolor, tokens in dolores.items()
-}
\ No newline at end of file
+LEXICON = construir_lexicon(dolores, sinonimos, conectores)
@@ -0,0 +1,143 @@
+import gzip
+import os
+import tempfile
+import weakref
+
+import pandas as pd
+import xlsxwriter
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet queda deshabilitado
+    pa = None
+    pq = None
+
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Filas que se convierten y escriben por vez: la memoria extra de una
+# exportación queda acotada a un bloque, sin importar el tamaño de la tabla
+FILAS_POR_BLOQUE = 10_000
+
+# Límite de filas de una hoja de Excel (sin contar el encabezado)
+MAX_FILAS_XLSX = 1_048_575
+
+
+def _bloques(tabla):
+    """Filas de 'tabla' como listas de valores de Python (nulos → None), por bloques."""
+    for inicio in range(0, len(tabla), FILAS_POR_BLOQUE):
+        bloque = tabla.iloc[inicio:inicio + FILAS_POR_BLOQUE]
+        columnas = [
+            serie.astype(object).where(serie.notna(), None).tolist()
+            for _, serie in bloque.items()
+        ]
+        yield zip(*columnas)
+
+
+def validar_xlsx(hojas):
+    """Lanza ValueError si alguna de las hojas (nombre, tabla, index) no entra en una hoja de Excel."""
+    for nombre, tabla, _ in hojas:
+        if len(tabla) > MAX_FILAS_XLSX:
+            raise ValueError(
+                f"La tabla '{nombre}' tiene {len(tabla)} filas y no entra en una hoja de Excel; exportala como CSV o Parquet."
+            )
+
+
+def escribir_xlsx(ruta, hojas):
+    """
+    Escribe un libro con XlsxWriter en modo constant_memory: cada fila se vuelca
+    a disco apenas se completa, por eso se escribe fila por fila (to_excel
+    escribe por columnas y anularía ese modo).
+    'hojas' es una lista de (nombre, tabla, index).
+    """
+    libro = xlsxwriter.Workbook(ruta, {
+        "constant_memory": True,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+        "remove_timezone": True,
+        "nan_inf_to_errors": True,
+    })
+    try:
+        negrita = libro.add_format({"bold": True})
+        for nombre, tabla, index in hojas:
+            if index:
+                tabla = tabla.reset_index()
+            validar_xlsx([(nombre, tabla, index)])
+            hoja = libro.add_worksheet(nombre[:31])
+            hoja.write_row(0, 0, [str(col) for col in tabla.columns], negrita)
+            fila = 1
+            for bloque in _bloques(tabla):
+                for valores in bloque:
+                    hoja.write_row(fila, 0, valores)
+                    fila += 1
+    finally:
+        libro.close()
+
+
+def escribir_csv_gz(ruta, tabla, index=False):
+    # utf-8-sig para que Excel reconozca los acentos al abrir el CSV
+    with gzip.open(ruta, "wt", encoding="utf-8-sig", newline="") as salida:
+        tabla.to_csv(salida, index=index, chunksize=FILAS_POR_BLOQUE)
+
+
+def preparar_para_arrow(tabla, index=False):
+    """Copia liviana de 'tabla' que Arrow puede convertir (nombres de columna y columnas de tipos mezclados como texto)."""
+    if index:
+        tabla = tabla.reset_index()
+    tabla = tabla.copy(deep=False)
+    tabla.columns = [str(col) for col in tabla.columns]
+    for col in tabla.columns:
+        # Arrow no acepta columnas con tipos mezclados (por ejemplo DNI numérico y texto)
+        if tabla[col].dtype == object and pd.api.types.infer_dtype(tabla[col], skipna=True).startswith("mixed"):
+            tabla[col] = tabla[col].where(tabla[col].isna(), tabla[col].astype(str))
+    return tabla
+
+
+def escribir_parquet(ruta, tabla, index=False):
+    tabla = preparar_para_arrow(tabla, index)
+    esquema = pa.Schema.from_pandas(tabla, preserve_index=False)
+    with pq.ParquetWriter(ruta, esquema) as escritor:
+        for inicio in range(0, len(tabla), FILAS_POR_BLOQUE):
+            bloque = tabla.iloc[inicio:inicio + FILAS_POR_BLOQUE]
+            escritor.write_table(pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False))
+
+
+# Formatos de exportación: etiqueta → (extensión, mime, función que escribe)
+FORMATOS = {
+    "Excel (.xlsx)": ("xlsx", MIME_XLSX, lambda ruta, tabla, index: escribir_xlsx(ruta, [("Datos", tabla, index)])),
+    "CSV comprimido (.csv.gz)": ("csv.gz", "application/gzip", escribir_csv_gz),
+}
+if pq is not None:
+    FORMATOS["Parquet"] = ("parquet", "application/vnd.apache.parquet", escribir_parquet)
+
+
+def _borrar(ruta):
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
+
+
+class ArchivoExportado:
+    """Archivo temporal con una exportación; se borra cuando deja de estar referenciado."""
+
+    def __init__(self, extension):
+        descriptor, self.ruta = tempfile.mkstemp(prefix="tablero_", suffix=f".{extension}")
+        os.close(descriptor)
+        self._finalizador = weakref.finalize(self, _borrar, self.ruta)
+
+    def abrir(self):
+        return open(self.ruta, "rb")
+
+    def borrar(self):
+        self._finalizador()
+
+
+def generar_archivo(extension, escribir):
+    """Crea el temporal y lo llena con escribir(ruta); si falla, no queda nada en disco."""
+    archivo = ArchivoExportado(extension)
+    try:
+        escribir(archivo.ruta)
+    except Exception:
+        archivo.borrar()
+        raise
+    return archivo
@@ -0,0 +1,102 @@
+import hashlib
+
+import pandas as pd
+import streamlit as st
+
+from escritores import FORMATOS, MIME_XLSX, escribir_xlsx, generar_archivo, validar_xlsx
+
+
+def huella_tabla(df, *parametros):
+    """
+    Huella de lo que determina el contenido de una tabla exportable: el dataset
+    (df.attrs["clave_dataset"]), los filtros de la barra lateral y los
+    parámetros propios de la tabla (búsqueda, checkboxes, radios...).
+    """
+    clave = df.attrs.get("clave_dataset")
+    if clave is None:
+        # Sin clave de dataset no queda otra que mirar el contenido
+        clave = int(pd.util.hash_pandas_object(df, index=False).sum())
+    partes = (clave, st.session_state.get("filtros_seleccionados", {}), parametros)
+    return hashlib.sha1(repr(partes).encode("utf-8")).hexdigest()
+
+
+def _boton_diferido(clave, huella, generar, etiqueta, nombre_archivo, extension, mime, contenedor):
+    """
+    Botón de descarga que genera el archivo recién al hacer clic: 'data' es una
+    función que Streamlit ejecuta aparte, fuera del script (ahí no se pueden
+    usar comandos de st). El archivo queda en la sesión bajo 'clave' mientras
+    'huella' no cambie, así otro clic lo reutiliza. generar(ruta) lo escribe.
+    """
+    exportaciones = st.session_state.setdefault("_exportaciones", {})
+
+    def datos():
+        guardado = exportaciones.get(clave)
+        if guardado is None or guardado[0] != huella:
+            archivo = generar_archivo(extension, generar)
+            # Una sola versión por tabla: la anterior ya no corresponde a los filtros actuales
+            if guardado is not None:
+                guardado[1].borrar()
+            guardado = (huella, archivo)
+            exportaciones[clave] = guardado
+        with guardado[1].abrir() as contenido:
+            return contenido.read()
+
+    contenedor.download_button(
+        label=etiqueta,
+        data=datos,
+        file_name=f"{nombre_archivo}.{extension}",
+        mime=mime,
+        key=f"descargar_{clave}",
+        on_click="ignore"
+    )
+
+
+def boton_descarga(tabla_id, construir, etiqueta, nombre_archivo, huella, index=False, hoja=None):
+    """
+    Descarga generada a pedido: el archivo se arma sólo cuando el usuario hace
+    clic en el botón y queda en la sesión asociado a (tabla_id, formato, huella).
+    Mientras la huella no cambie, otro clic lo descarga sin volver a serializar nada. 'construir' devuelve el DataFrame a exportar;
+    'nombre_archivo' va sin extensión (la pone el formato elegido).
+    Con 'hoja', la tabla además entra en el libro completo (boton_libro_completo).
+    """
+    if hoja is not None:
+        st.session_state.setdefault("_hojas_exportables", {})[tabla_id] = (hoja, construir, index, huella)
+
+    formato = st.radio("Formato", list(FORMATOS), horizontal=True, key=f"formato_{tabla_id}")
+    extension, mime, escribir = FORMATOS[formato]
+    if extension == "xlsx":
+        # Se valida antes: si la función de 'data' falla, el navegador sólo muestra un error genérico
+        try:
+            validar_xlsx([(tabla_id, construir(), index)])
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            return
+    _boton_diferido(
+        tabla_id, (huella, formato), lambda ruta: escribir(ruta, construir(), index),
+        etiqueta, nombre_archivo, extension, mime, st
+    )
+
+
+def boton_libro_completo(etiqueta, nombre_archivo, contenedor=st):
+    """
+    Un solo libro .xlsx con todas las tablas que se registraron en esta
+    ejecución (boton_descarga con 'hoja'), escrito de una pasada. Reutiliza los
+    DataFrames que ya armaron las vistas, con sus filtros y parámetros actuales.
+    Se llama al final del script: consume el registro para no retener los
+    DataFrames entre ejecuciones.
+    """
+    hojas = st.session_state.pop("_hojas_exportables", {})
+    if not hojas:
+        return
+    huella = hashlib.sha1(repr(sorted((tabla_id, h[3]) for tabla_id, h in hojas.items())).encode("utf-8")).hexdigest()
+
+    try:
+        validar_xlsx([(nombre, construir(), index) for nombre, construir, index, _ in hojas.values()])
+    except ValueError as e:
+        contenedor.error(f"❌ {e}")
+        return
+
+    def generar(ruta):
+        escribir_xlsx(ruta, [(nombre, construir(), index) for nombre, construir, index, _ in hojas.values()])
+
+    _boton_diferido("libro_completo", huella, generar, etiqueta, nombre_archivo, "xlsx", MIME_XLSX, contenedor)
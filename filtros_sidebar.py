@@ -1,121 +1,213 @@
 # filtros_sidebar.py mejorado
 import streamlit as st
 import pandas as pd
+import numpy as np
+from data_loader import ordenado_por_fecha, rango_fechas, meses_de_rango
+from dolor_detector import codificar_dolores, mascara_dolores, ETIQUETAS_DOLOR
+from instrumentacion import medido
 
+# Filtros de selección múltiple, en el orden en que aparecen en la barra lateral:
+# (columna, título, opción que desactiva el filtro)
+FILTROS = [
+    ("Grupo NPS", "👥 Grupo NPS", "Todos"),
+    ("Dolor", "💥 Tipo de Dolor", "Todos"),
+    ("¿Cuál fue el factor que más influyó en tu nota?", "📌 ¿Cuál fue el factor que más influyó en tu nota?", "Todas"),
+    ("¿Qué tan fácil te resulta usar Flow? Q3.1", "¿Qué tan fácil te resulta usar Flow? Q3.1", "Todas"),
+    # Q5.1 En el último mes, ¿Te contactaste con nuestro centro de atención al cliente
+    # (Canal digital, telefónico y/o presencial)?
+    ("¿Te contactaste con nuestro centro de atención? Q5.1", "¿Te contactaste con nuestro centro de atención? Q5.1", "Todas"),
+    ("¿A través de que canal/es te contactaste? Q5.2", "¿A través de que canal/es te contactaste? Q5.2", "Todas"),
+    ("¿Fue resuelto el motivo de tu contacto? Q5.3", "¿Fue resuelto el motivo de tu contacto? Q5.3", "Todas"),
+    ("TECNOLOGIA_FLOW", "TECNOLOGIA_FLOW", "Todas"),
+]
+
+# Etiquetas de dolor que no se ofrecen como filtro
+_DOLORES_OCULTOS = ["Indefinido", "Vacío", ""]
+
+
+class MotorFiltros:
+    """
+    Índice invertido de bitmaps de un dataset: para cada (columna, valor) guarda
+    las filas que tienen ese valor como bits empaquetados (np.packbits).
+    Cualquier combinación de filtros se resuelve intersectando bitmaps y el
+    DataFrame filtrado se materializa una sola vez, al final.
+    """
+
+    def __init__(self, df):
+        self.n = len(df)
+        self._bitmaps = {}   # columna → {valor: bitmap}
+        for columna, _, _ in FILTROS:
+            if columna == "Dolor" and "Dolor" in df.columns:
+                bits = df["_dolor_bits"].to_numpy() if "_dolor_bits" in df.columns else codificar_dolores(df["Dolor"])
+                self._bitmaps["Dolor"] = {
+                    etiqueta: np.packbits(mascara_dolores(bits, [etiqueta]))
+                    for etiqueta in ETIQUETAS_DOLOR
+                }
+            elif columna in df.columns:
+                # factorize deja los nulos fuera (código -1), igual que dropna()
+                codigos, valores = pd.factorize(df[columna])
+                self._bitmaps[columna] = {
+                    valor: np.packbits(codigos == k) for k, valor in enumerate(valores)
+                }
+
+    def tiene(self, columna):
+        return columna in self._bitmaps
+
+    def todas(self):
+        return np.packbits(np.ones(self.n, dtype=bool))
+
+    def desde_booleanos(self, condicion):
+        return np.packbits(np.asarray(condicion, dtype=bool))
+
+    def desde_rango(self, inicio, fin):
+        """Bitmap de las filas en posiciones [inicio, fin)."""
+        filas = np.zeros(self.n, dtype=bool)
+        filas[inicio:fin] = True
+        return np.packbits(filas)
+
+    def valores_presentes(self, columna, mascara):
+        """Valores de 'columna' que tienen al menos una fila dentro de 'mascara'."""
+        return [
+            valor for valor, bitmap in self._bitmaps[columna].items()
+            if np.bitwise_and(bitmap, mascara).any()
+        ]
+
+    def mascara_de(self, columna, seleccion):
+        """Filas con alguno de los valores seleccionados (unión de bitmaps)."""
+        mascara = np.zeros((self.n + 7) // 8, dtype=np.uint8)
+        for valor in seleccion:
+            bitmap = self._bitmaps[columna].get(valor)
+            if bitmap is not None:
+                mascara |= bitmap
+        return mascara
+
+    def materializar(self, df, mascara):
+        return df[np.unpackbits(mascara, count=self.n).astype(bool)]
+
+
+def _motor_para(df):
+    """
+    El motor se arma una vez por dataset y se guarda en la sesión; la clave es
+    df.attrs["clave_dataset"] (la asignan el pipeline de carga y el cubo).
+    """
+    clave = df.attrs.get("clave_dataset")
+    motores = st.session_state.setdefault("_motores_filtros", {})
+    if clave is not None and clave in motores:
+        return motores[clave]
+    motor = MotorFiltros(df)
+    if clave is not None:
+        # Alcanza con el dataset actual
+        motores.clear()
+        motores[clave] = motor
+    return motor
+
+
+def _filtrar_fechas(motor, fechas, inicio, fin):
+    if not pd.api.types.is_datetime64_any_dtype(fechas):
+        fechas = pd.to_datetime(fechas, errors='coerce')
+    if ordenado_por_fecha(fechas):
+        return motor.desde_rango(*rango_fechas(fechas, inicio, fin))
+    return motor.desde_booleanos((fechas >= pd.Timestamp(inicio)) & (fechas < pd.Timestamp(fin)))
+
+
+def filtrar_filas(df, selecciones):
+    """
+    Filas del dataset que cumplen las selecciones (las de aplicar_filtros, sin
+    widgets): "Fecha" → (inicio, fin), "Mes" → meses y columna → valores.
+    """
+    motor = MotorFiltros(df)
+    mascara = motor.todas()
+    for columna, seleccion in selecciones.items():
+        if columna == "Fecha":
+            mascara &= _filtrar_fechas(motor, df["Fecha"], *seleccion)
+        elif columna == "Mes":
+            mascara &= motor.desde_booleanos(df["Mes"].isin(seleccion))
+        elif motor.tiene(columna):
+            mascara &= motor.mascara_de(columna, seleccion)
+    return motor.materializar(df, mascara).reset_index(drop=True)
+
+
+@medido("filtrar_cubo")
+def filtrar_cubo(cubo, selecciones):
+    """
+    Aplica al cubo de conteos las mismas selecciones que aplicar_filtros dejó en
+    st.session_state["filtros_seleccionados"]. Devuelve None si alguna no se
+    puede resolver con las dimensiones del cubo (un rango de fechas que corta
+    meses o una columna que no está en el cubo): ahí hay que agregar las filas
+    ya filtradas con cubo.construir_cubo.
+    """
+    if any(columna not in cubo.columns for columna in selecciones):
+        return None
+    mascara = np.ones(len(cubo), dtype=bool)
+    for columna, seleccion in selecciones.items():
+        if columna == "Dolor":
+            mascara &= mascara_dolores(codificar_dolores(cubo["Dolor"]), seleccion)
+        else:
+            mascara &= cubo[columna].isin(seleccion).to_numpy()
+    return cubo[mascara].reset_index(drop=True)
+
+
+@medido("aplicar_filtros")
 def aplicar_filtros(df):
     st.sidebar.subheader("👩‍💻​ Filtros")
+    motor = _motor_para(df)
+    mascara = motor.todas()
+    # Selecciones activas (columna → valores; "Mes" → meses o "Fecha" → (inicio, fin)), para filtrar el cubo
+    selecciones = {}
 
-    # Filtro por fecha
+    # Filtro por fecha: el dataset viene ordenado por fecha (data_loader.preparar_fechas),
+    # así que el rango es un tramo contiguo de filas que se ubica por búsqueda binaria
     if "Fecha" in df.columns:
-        fechas = pd.to_datetime(df["Fecha"], errors='coerce')
+        fechas = df["Fecha"]
+        if not pd.api.types.is_datetime64_any_dtype(fechas):
+            fechas = pd.to_datetime(fechas, errors='coerce')
         fecha_min, fecha_max = fechas.min(), fechas.max()
-        rango_fechas = st.sidebar.date_input("Seleccioná un rango de fechas:", [fecha_min, fecha_max], min_value=fecha_min, max_value=fecha_max)
-        df = df[(fechas >= pd.to_datetime(rango_fechas[0])) & (fechas <= pd.to_datetime(rango_fechas[1]))]
-
-    # Filtro por Grupo NPS
-    if "Grupo NPS" in df.columns:
-        grupo_nps_opciones = df["Grupo NPS"].dropna().unique().tolist()
-        grupo_nps = st.sidebar.multiselect(
-            "👥 Grupo NPS",
-            options=["Todos"] + grupo_nps_opciones,
-            default=["Todos"]
-        )
-        if "Todos" not in grupo_nps:
-            df = df[df["Grupo NPS"].isin(grupo_nps)]
-
-    # Filtro por Dolor
-    if "Dolor" in df.columns:
-        # Asegurarse de que todo sea string separado por comas
-        df["Dolor"] = df["Dolor"].apply(lambda x: ", ".join(x) if isinstance(x, list) else x)
-
-        lista_dolores = sorted(set([
-            d.strip() for sublist in df["Dolor"].dropna().str.split(",")
-            for d in sublist
-        ]))
-        lista_dolores = [d for d in lista_dolores if d not in ["Indefinido", "Vacío", ""]]
-
-        dolores_seleccionados = st.sidebar.multiselect(
-            "💥 Tipo de Dolor",
-            options=["Todos"] + lista_dolores,
-            default=["Todos"]
-        )
-
-        if "Todos" not in dolores_seleccionados:
-            df = df[df["Dolor"].str.contains("|".join(dolores_seleccionados), na=False)]
+        rango = st.sidebar.date_input("Seleccioná un rango de fechas:", [fecha_min, fecha_max], min_value=fecha_min, max_value=fecha_max)
+        if len(rango) == 2:
+            # El día final se incluye completo
+            inicio, fin = pd.Timestamp(rango[0]), pd.Timestamp(rango[1]) + pd.Timedelta(days=1)
+            mascara &= _filtrar_fechas(motor, fechas, inicio, fin)
+            # Si el rango toma meses completos (como el rango por defecto), el cubo lo resuelve por "Mes"
+            meses = meses_de_rango(fechas, inicio, fin)
+            if meses is not None:
+                selecciones["Mes"] = meses
+            else:
+                selecciones["Fecha"] = (inicio, fin)
 
+    # Filtros de selección múltiple: las opciones de cada uno salen de las filas
+    # que dejaron los filtros anteriores
+    for columna, titulo, opcion_todas in FILTROS:
+        if not motor.tiene(columna):
+            continue
+        opciones = motor.valores_presentes(columna, mascara)
+        if columna == "Dolor":
+            opciones = [d for d in sorted(opciones) if d not in _DOLORES_OCULTOS]
+        elif columna != "Grupo NPS":
+            opciones = sorted(opciones)
 
-    # Filtro por causa (Q2.1)
-    causa_col = "¿Cuál fue el factor que más influyó en tu nota?"
-    if causa_col in df.columns:
-        causas_unicas = df[causa_col].dropna().unique()
-        causa_seleccionada = st.sidebar.multiselect(
-            "📌 ¿Cuál fue el factor que más influyó en tu nota?",
-            options=["Todas"] + sorted(causas_unicas),
-            default=["Todas"]
+        seleccion = st.sidebar.multiselect(
+            titulo,
+            options=[opcion_todas] + opciones,
+            default=[opcion_todas]
         )
-        if "Todas" not in causa_seleccionada:
-            df = df[df[causa_col].isin(causa_seleccionada)]
-            
-    # Filtro ¿Qué tan fácil te resulta usar Flow? Q3.1
-    causa_col = "¿Qué tan fácil te resulta usar Flow? Q3.1"
-    if causa_col in df.columns:
-        causas_unicas = df[causa_col].dropna().unique()
-        causa_seleccionada = st.sidebar.multiselect(
-            "¿Qué tan fácil te resulta usar Flow? Q3.1",
-            options=["Todas"] + sorted(causas_unicas),
-            default=["Todas"]
-        )
-        if "Todas" not in causa_seleccionada:
-            df = df[df[causa_col].isin(causa_seleccionada)]
-            
-    # Filtro Q5.1 En el último mes, ¿Te contactaste con nuestro centro de atención al cliente 
-    # (Canal digital, telefónico y/o presencial)?
-    causa_col = "¿Te contactaste con nuestro centro de atención? Q5.1"
-    if causa_col in df.columns:
-        causas_unicas = df[causa_col].dropna().unique()
-        causa_seleccionada = st.sidebar.multiselect(
-            "¿Te contactaste con nuestro centro de atención? Q5.1",
-            options=["Todas"] + sorted(causas_unicas),
-            default=["Todas"]
-        )
-        if "Todas" not in causa_seleccionada:
-            df = df[df[causa_col].isin(causa_seleccionada)]
-            
-    # Filtro Q5.2 ¿A través de que canal/es te contactaste?
-    causa_col = "¿A través de que canal/es te contactaste? Q5.2"
-    if causa_col in df.columns:
-        causas_unicas = df[causa_col].dropna().unique()
-        causa_seleccionada = st.sidebar.multiselect(
-            "¿A través de que canal/es te contactaste? Q5.2",
-            options=["Todas"] + sorted(causas_unicas),
-            default=["Todas"]
-        )
-        if "Todas" not in causa_seleccionada:
-            df = df[df[causa_col].isin(causa_seleccionada)]
-            
-    # Filtro Q5.3 ¿Fue resuelto el motivo de tu contacto?
-    causa_col = "¿Fue resuelto el motivo de tu contacto? Q5.3"
-    if causa_col in df.columns:
-        causas_unicas = df[causa_col].dropna().unique()
-        causa_seleccionada = st.sidebar.multiselect(
-            "¿Fue resuelto el motivo de tu contacto? Q5.3",
-            options=["Todas"] + sorted(causas_unicas),
-            default=["Todas"]
-        )
-        if "Todas" not in causa_seleccionada:
-            df = df[df[causa_col].isin(causa_seleccionada)]
-            
-    # Filtro TECNOLOGIA
-    causa_col = "TECNOLOGIA_FLOW"
-    if causa_col in df.columns:
-        causas_unicas = df[causa_col].dropna().unique()
-        causa_seleccionada = st.sidebar.multiselect(
-            "TECNOLOGIA_FLOW",
-            options=["Todas"] + sorted(causas_unicas),
-            default=["Todas"]
-        )
-        if "Todas" not in causa_seleccionada:
-            df = df[df[causa_col].isin(causa_seleccionada)]
-    
+        if opcion_todas not in seleccion:
+            selecciones[columna] = seleccion
+            mascara &= motor.mascara_de(columna, seleccion)
+
+    st.session_state["filtros_seleccionados"] = selecciones
+    # La máscara (empaquetada) queda para cruzarla con índices del dataset completo (mascara_filtros)
+    st.session_state["_mascara_filtros"] = (df.attrs.get("clave_dataset"), mascara)
+    return motor.materializar(df, mascara).reset_index(drop=True)
+
 
-    return df.reset_index(drop=True)
+def mascara_filtros(df):
+    """
+    Máscara booleana, sobre todas las filas de 'df', de la última vez que se le
+    aplicaron los filtros en esta sesión; None si no corresponde a ese dataset.
+    Las filas que devuelve aplicar_filtros son las True, en el mismo orden.
+    """
+    clave = df.attrs.get("clave_dataset")
+    guardada = st.session_state.get("_mascara_filtros")
+    if clave is None or guardada is None or guardada[0] != clave:
+        return None
+    return np.unpackbits(guardada[1], count=len(df)).astype(bool)
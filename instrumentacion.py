@@ -0,0 +1,125 @@
+import contextvars
+import functools
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:  # Sin psutil se lee /proc (Linux) o no se informa memoria
+    psutil = None
+
+# Registro de la ejecución en curso. Cada sesión de Streamlit corre su script en
+# su propio hilo, así que cada rerun ve sólo su registro; fuera de una ejecución
+# registrada (CLI, benchmarks) las etapas no miden nada.
+_registro_actual = contextvars.ContextVar("registro_etapas", default=None)
+
+_TAMANO_PAGINA = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def memoria_proceso():
+    """Memoria residente del proceso en bytes (o None si no se puede leer)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _TAMANO_PAGINA
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RegistroEjecucion:
+    """Etapas medidas durante una ejecución del script, en orden de inicio."""
+
+    def __init__(self):
+        self.inicio = time.time()
+        self._reloj = time.perf_counter()
+        self.etapas = []
+        self.nivel = 0
+        self.total = None
+
+    def cerrar(self):
+        self.total = time.perf_counter() - self._reloj
+        return self
+
+
+class Medicion:
+    """Resultado de una etapa; 'filas_salida' lo completa quien la mide."""
+
+    def __init__(self, nombre, nivel, filas_entrada=None):
+        self.nombre = nombre
+        self.nivel = nivel
+        self.filas_entrada = filas_entrada
+        self.filas_salida = None
+        self.segundos = None
+        self.memoria_delta = None
+
+    def como_dict(self):
+        return {
+            "etapa": self.nombre,
+            "nivel": self.nivel,
+            "segundos": self.segundos,
+            "filas_entrada": self.filas_entrada,
+            "filas_salida": self.filas_salida,
+            "memoria_delta_mb": None if self.memoria_delta is None else self.memoria_delta / 2**20,
+        }
+
+
+@contextmanager
+def registrar_ejecucion():
+    """Activa el registro de etapas para el bloque (una ejecución del script)."""
+    registro = RegistroEjecucion()
+    token = _registro_actual.set(registro)
+    try:
+        yield registro
+    finally:
+        _registro_actual.reset(token)
+        registro.cerrar()
+
+
+@contextmanager
+def etapa(nombre, filas_entrada=None):
+    """
+    Mide tiempo de reloj y variación de memoria del bloque. La memoria es la
+    residente de todo el proceso: con varias sesiones a la vez es orientativa.
+    """
+    registro = _registro_actual.get()
+    if registro is None:
+        yield Medicion(nombre, 0, filas_entrada)
+        return
+    medicion = Medicion(nombre, registro.nivel, filas_entrada)
+    # Se agrega al empezar para que las etapas anidadas queden debajo de su etapa
+    registro.etapas.append(medicion)
+    registro.nivel += 1
+    memoria_inicial = memoria_proceso()
+    inicio = time.perf_counter()
+    try:
+        yield medicion
+    finally:
+        medicion.segundos = time.perf_counter() - inicio
+        memoria_final = memoria_proceso()
+        if memoria_inicial is not None and memoria_final is not None:
+            medicion.memoria_delta = memoria_final - memoria_inicial
+        registro.nivel -= 1
+
+
+def _filas(objeto):
+    return len(objeto) if hasattr(objeto, "__len__") and not isinstance(objeto, (str, bytes)) else None
+
+
+def medido(nombre):
+    """
+    Decorador: registra la función como etapa. Las filas de entrada son las del
+    primer argumento y las de salida las del resultado, cuando tienen largo.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if _registro_actual.get() is None:
+                return funcion(*args, **kwargs)
+            with etapa(nombre, _filas(args[0]) if args else None) as medicion:
+                resultado = funcion(*args, **kwargs)
+                medicion.filas_salida = _filas(resultado)
+            return resultado
+        return envoltura
+    return decorador
@@ -0,0 +1,144 @@
+import cProfile
+import marshal
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import cached_property
+
+import pandas as pd
+
+from escritores import ArchivoExportado
+
+# Cuadros por asignación que guarda tracemalloc (más cuadros = más memoria y más lento)
+CUADROS_TRACEMALLOC = 10
+
+# Filas de los resúmenes que se muestran
+FUNCIONES_MOSTRADAS = 30
+ASIGNACIONES_MOSTRADAS = 20
+
+
+def _ubicacion(archivo, linea, funcion=None):
+    # Las dos últimas partes de la ruta alcanzan para ubicar el archivo
+    corto = os.sep.join(archivo.split(os.sep)[-2:])
+    return f"{corto}:{linea}" + (f" ({funcion})" if funcion else "")
+
+
+class CapturaPerfil:
+    """
+    cProfile y snapshot de tracemalloc de una ejecución. Al terminar la captura
+    (cerrar) quedan sólo los resúmenes y los archivos volcados a disco: es lo
+    que se guarda en la sesión.
+    """
+
+    def __init__(self):
+        self.inicio = time.time()
+        self.segundos = None
+        self.perfil = cProfile.Profile()
+        self.snapshot = None
+
+    @cached_property
+    def funciones(self):
+        """Funciones con más tiempo acumulado."""
+        estadisticas = pstats.Stats(self.perfil).stats
+        filas = [
+            {
+                "función": _ubicacion(archivo, linea, funcion),
+                "llamadas": llamadas,
+                "tiempo_propio": propio,
+                "tiempo_acumulado": acumulado,
+            }
+            for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in estadisticas.items()
+        ]
+        return pd.DataFrame(filas).sort_values("tiempo_acumulado", ascending=False).head(FUNCIONES_MOSTRADAS).reset_index(drop=True)
+
+    @cached_property
+    def asignaciones(self):
+        """Líneas con más memoria asignada (y todavía viva) al final de la ejecución."""
+        if self.snapshot is None:
+            return pd.DataFrame()
+        filas = [
+            {
+                "ubicación": _ubicacion(estadistica.traceback[0].filename, estadistica.traceback[0].lineno),
+                "KB": estadistica.size / 1024,
+                "bloques": estadistica.count,
+            }
+            for estadistica in self.snapshot.statistics("lineno")[:ASIGNACIONES_MOSTRADAS]
+        ]
+        return pd.DataFrame(filas)
+
+    @cached_property
+    def archivo_pstats(self):
+        """Archivo .pstats (se abre con pstats.Stats o snakeviz)."""
+        self.perfil.create_stats()
+        archivo = ArchivoExportado("pstats")
+        with open(archivo.ruta, "wb") as f:
+            marshal.dump(self.perfil.stats, f)
+        return archivo
+
+    @cached_property
+    def archivo_snapshot(self):
+        """Snapshot de tracemalloc (se abre con tracemalloc.Snapshot.load)."""
+        archivo = ArchivoExportado("tracemalloc")
+        self.snapshot.dump(archivo.ruta)
+        return archivo
+
+    def cerrar(self):
+        """Calcula los resúmenes, vuelca los archivos y suelta el perfil y el snapshot completos."""
+        for resumen in ("funciones", "asignaciones", "archivo_pstats", "archivo_snapshot"):
+            getattr(self, resumen)
+        self.perfil = None
+        self.snapshot = None
+
+
+# tracemalloc es global al proceso: lo arranca la primera captura activa y lo
+# detiene la última, así una sesión no lo apaga mientras otra sigue perfilando
+_lock_tracemalloc = threading.Lock()
+_capturas_activas = 0
+_tracemalloc_iniciado_aca = False
+
+
+def _empezar_tracemalloc():
+    global _capturas_activas, _tracemalloc_iniciado_aca
+    with _lock_tracemalloc:
+        if _capturas_activas == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(CUADROS_TRACEMALLOC)
+            _tracemalloc_iniciado_aca = True
+        _capturas_activas += 1
+
+
+def _terminar_tracemalloc():
+    global _capturas_activas, _tracemalloc_iniciado_aca
+    with _lock_tracemalloc:
+        _capturas_activas -= 1
+        # Si ya estaba activo antes (por ejemplo con PYTHONTRACEMALLOC) no se detiene
+        if _capturas_activas == 0 and _tracemalloc_iniciado_aca:
+            tracemalloc.stop()
+            _tracemalloc_iniciado_aca = False
+
+
+@contextmanager
+def capturar_perfil():
+    """
+    Perfila el bloque con cProfile (sólo el hilo actual) y toma un snapshot de
+    tracemalloc al final. tracemalloc es global al proceso: con otras sesiones
+    activas, sus asignaciones también aparecen.
+    """
+    captura = CapturaPerfil()
+    _empezar_tracemalloc()
+    inicio = time.perf_counter()
+    captura.perfil.enable()
+    try:
+        yield captura
+    finally:
+        captura.perfil.disable()
+        captura.segundos = time.perf_counter() - inicio
+        captura.snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ])
+        _terminar_tracemalloc()
+        captura.cerrar()
@@ -0,0 +1,81 @@
+import hashlib
+
+from data_loader import cargar_datos, optimizar_tipos
+from dolor_detector import clasificar_dolores, clasificar_q3_2, filtrar_alerta_match
+from dolores_keywords import LEXICON
+import cache_datasets
+from acumulado import acumulado_por_defecto
+from instrumentacion import etapa, medido
+
+
+# Versión de lo que devuelve procesar_archivo (columnas, tipos, clasificaciones):
+# se sube cuando cambia, así los snapshots en disco y el cache en memoria no
+# devuelven datasets armados por una versión anterior
+VERSION_PROCESAMIENTO = 1
+
+
+def hash_archivo(contenido):
+    """Hash del contenido del archivo subido (bytes)."""
+    return hashlib.sha256(contenido).hexdigest()
+
+
+def clave_archivo(contenido):
+    """Clave de los caches de datasets procesados: (hash del archivo, versión del léxico y del procesamiento)."""
+    return hash_archivo(contenido), f"{LEXICON.version}-{VERSION_PROCESAMIENTO}"
+
+
+def procesar_archivo(archivo):
+    """Carga el Excel, aplica la clasificación de dolores y de maltrato y compacta los tipos."""
+    df = cargar_datos(archivo)
+    if df is None or df.empty:
+        return df
+    df = clasificar_dolores(df)
+    df = clasificar_q3_2(df)
+    df = filtrar_alerta_match(df)
+    return optimizar_tipos(df)
+
+
+@medido("cargar_archivo")
+def cargar_archivo(archivo):
+    """
+    Igual que 'procesar_archivo', pero reutiliza el resultado si ya se procesó un
+    archivo con el mismo contenido (y las mismas versiones del léxico y del procesamiento):
+    1) Cache en memoria: los reruns de Streamlit no vuelven a leer ni clasificar.
+    2) Snapshot columnar en disco: recargar un archivo ya visto no parsea el Excel.
+    """
+    clave = clave_archivo(archivo.getvalue())
+    cache = cache_datasets.cache_por_defecto()
+    df = cache.obtener(clave)
+    if df is not None:
+        return df
+
+    snapshots = cache_datasets.snapshots_por_defecto()
+    with etapa("leer_snapshot"):
+        df = snapshots.leer(clave)
+    if df is None:
+        df = procesar_archivo(archivo)
+        if df is None or df.empty:
+            return df
+        snapshots.escribir(clave, df)
+
+    # Identifica al dataset para los índices que se arman una vez por dataset (filtros)
+    df.attrs["clave_dataset"] = "archivo:" + ":".join(clave)
+    cache.guardar(clave, df)
+    return df.copy(deep=False)
+
+
+@medido("anexar_archivo")
+def anexar_archivo(archivo):
+    """
+    Suma un archivo nuevo (por ejemplo, el mes siguiente) al dataset acumulado.
+    Devuelve la cantidad de encuestas nuevas, o None si el archivo no tiene la hoja
+    de la encuesta (los errores de lectura se propagan como ErrorCargaDatos).
+    """
+    hash_actual = hash_archivo(archivo.getvalue())
+    acumulado = acumulado_por_defecto()
+    if acumulado.contiene_archivo(hash_actual):
+        return 0
+    df = cargar_datos(archivo)
+    if df is None:
+        return None
+    return acumulado.anexar(df, hash_actual)
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Los módulos del tablero están en la raíz del repositorio (sin paquete)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Caches en disco (clasificaciones, snapshots, acumulado) fuera del directorio del usuario
+os.environ.setdefault("TABLERO_CACHE_DIR", tempfile.mkdtemp(prefix="tablero_tests_"))
@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+from acumulado import DatasetAcumulado, ErrorAcumulado, claves_encuesta
+from data_loader import marcar_indefinidos, preparar_fechas, COLUMNAS_TEXTO
+from utils import preparar_textos
+
+COL_Q13 = "¿Cuál es el motivo de tu calificación?"
+
+
+def _encuestas(dnis, fechas, verbatims=None):
+    """Un lote como el que devuelve data_loader.cargar_datos."""
+    df = pd.DataFrame({
+        "Fecha": fechas,
+        "Grupo NPS": "Promotor",
+        "DNI": dnis,
+        COL_Q13: verbatims if verbatims is not None else ["el precio es caro"] * len(dnis),
+    })
+    df["verbatim"] = df[COL_Q13]
+    return preparar_textos(marcar_indefinidos(preparar_fechas(df), COLUMNAS_TEXTO), COLUMNAS_TEXTO)
+
+
+def _lote(inicio, cantidad):
+    return _encuestas(list(range(inicio, inicio + cantidad)), ["2024-01-05 10:00"] * cantidad)
+
+
+def test_clave_dataset_distinta_al_vaciar_y_volver_a_anexar(tmp_path):
+    acumulado = DatasetAcumulado(str(tmp_path))
+    acumulado.anexar(_lote(0, 3), "A")
+    acumulado.anexar(_lote(100, 2), "B")
+    antes = acumulado.obtener()
+    acumulado.vaciar()
+    acumulado.anexar(_lote(200, 5), "C")
+    acumulado.anexar(_lote(100, 2), "B")
+    despues = acumulado.obtener()
+    assert (len(antes), len(despues)) == (5, 7)
+    assert antes.attrs["clave_dataset"] != despues.attrs["clave_dataset"]
+
+
+def test_claves_encuesta_dni_numerico_y_faltantes():
+    df = pd.DataFrame({
+        "DNI": pd.Series([12345678.0, "12345678", " 12345678.0 ", None, None, "abc"], dtype=object),
+        "Fecha": pd.to_datetime(["2024-01-05 10:00"] * 3 + [None, "2024-01-05 10:00", "2024-01-05 10:00"]),
+    })
+    claves = claves_encuesta(df)
+    assert claves[:3].tolist() == ["12345678|2024-01-05 10:00:00"] * 3
+    assert claves[3:5].isna().all()
+    assert claves[5] == "abc|2024-01-05 10:00:00"
+    assert claves_encuesta(df.assign(Fecha=pd.NaT)).isna().all()
+
+
+def test_claves_encuesta_sin_columnas():
+    with pytest.raises(ValueError):
+        claves_encuesta(pd.DataFrame({"DNI": [1]}))
+
+
+def test_anexar_deduplica_sólo_filas_con_dni_y_fecha(tmp_path):
+    acumulado = DatasetAcumulado(str(tmp_path))
+    fechas = ["2024-01-05 10:00", "2024-01-05 10:00", None, None, "2024-01-06 09:00"]
+    lote = _encuestas([1.0, None, None, 2, None], fechas)
+    assert acumulado.anexar(lote, "A") == 5
+    # El mismo lote en otro archivo (DNI ahora como entero/texto): sólo vuelven las filas sin clave
+    otra_vez = _encuestas([1, None, None, "2", None], fechas)
+    assert acumulado.anexar(otra_vez, "B") == 4
+    assert len(acumulado.obtener()) == 9
+    assert acumulado.contiene_archivo("B")
+
+
+def test_acumulado_con_otro_formato_pide_vaciarlo(tmp_path):
+    DatasetAcumulado(str(tmp_path)).anexar(_lote(0, 3), "A")
+    (tmp_path / "formato.json").unlink()
+    acumulado = DatasetAcumulado(str(tmp_path))
+    with pytest.raises(ErrorAcumulado):
+        acumulado.obtener()
+    acumulado.vaciar()
+    assert acumulado.anexar(_lote(0, 3), "A") == 3
+    assert len(DatasetAcumulado(str(tmp_path)).obtener()) == 3
@@ -0,0 +1,53 @@
+import random
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from busqueda import IndiceBusqueda
+from utils import normalizar_texto
+
+TEXTOS = pd.Series([
+    "La app no anda", "no-anda el_deco", "De la   app!!", "ÁRBOL árbol", "Excelente servicio",
+    "la aplicación se cuelga", "", "¡¡¡", None, float("nan"), 123, "deco deco deco", "anda bien la app",
+    "muy lento el servicio técnico", "Técnico no vino", "appapp", "sin palabras",
+], dtype=object)
+
+
+def buscar_fila_por_fila(textos, palabras, palabra_completa=False):
+    """
+    La búsqueda tal como se hacía antes del índice: substring sobre cada texto
+    normalizado (los nulos como "nan"). Una palabra vacía está en cualquier texto.
+    """
+    normalizados = [normalizar_texto(texto) for texto in textos.astype(str).map(str)]
+    if palabra_completa:
+        patrones = [re.compile(r"(?<!\S)" + re.escape(p) + r"(?!\S)") for p in palabras]
+        return np.array([
+            any(patron.search(t) is not None if p else True for p, patron in zip(palabras, patrones))
+            for t in normalizados
+        ])
+    return np.array([any(p in t for p in palabras) for t in normalizados])
+
+
+@pytest.mark.parametrize("consulta", [
+    ["app"], ["la app"], ["an"], ["árbol"], ["no anda", "deco"], ["el_deco"], ["nan"], ["none"],
+    ["123"], ["tecnico"], ["zzzz"], ["¡¡"], ["a"], ["deco deco"],
+])
+@pytest.mark.parametrize("palabra_completa", [False, True])
+def test_buscar_igual_a_fila_por_fila(consulta, palabra_completa):
+    palabras = [normalizar_texto(p) for p in consulta]
+    indice = IndiceBusqueda.desde_textos(TEXTOS)
+    esperado = buscar_fila_por_fila(TEXTOS, palabras, palabra_completa)
+    np.testing.assert_array_equal(indice.buscar(palabras, palabra_completa), esperado)
+
+
+def test_buscar_fragmentos_al_azar():
+    indice = IndiceBusqueda.desde_textos(TEXTOS)
+    vocabulario = sorted({tok for texto in TEXTOS.astype(str).map(str) for tok in normalizar_texto(texto).split()})
+    aleatorio = random.Random(0)
+    for _ in range(200):
+        palabra = aleatorio.choice(vocabulario)
+        inicio = aleatorio.randrange(len(palabra))
+        palabras = [palabra[inicio:aleatorio.randint(inicio + 1, len(palabra))]]
+        np.testing.assert_array_equal(indice.buscar(palabras), buscar_fila_por_fila(TEXTOS, palabras))
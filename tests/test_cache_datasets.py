@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+
+from cache_datasets import SnapshotsDisco, feather
+
+pytestmark = pytest.mark.skipif(feather is None, reason="sin pyarrow no hay snapshots")
+
+
+def test_snapshot_con_dni_mezclado(tmp_path):
+    snapshots = SnapshotsDisco(str(tmp_path))
+    df = pd.DataFrame({
+        "DNI": pd.Series([12345678, "X1234", None, 87654321.0], dtype=object),
+        "Dolor": pd.Categorical(["Precio", "Velocidad", "Precio", "Precio"]),
+        "Fecha": pd.to_datetime(["2024-01-05", "2024-01-06", None, "2024-02-01"]),
+    })
+    snapshots.escribir(("hash", "v1"), df)
+    leido = snapshots.leer(("hash", "v1"))
+    assert leido is not None
+    assert leido["DNI"].tolist()[:2] == ["12345678", "X1234"] and pd.isna(leido["DNI"][2])
+    pd.testing.assert_series_equal(leido["Dolor"], df["Dolor"])
+    pd.testing.assert_series_equal(leido["Fecha"], df["Fecha"], check_dtype=False)
+
+
+def test_snapshot_reemplaza_versiones_viejas(tmp_path):
+    snapshots = SnapshotsDisco(str(tmp_path))
+    df = pd.DataFrame({"a": [1, 2]})
+    snapshots.escribir(("hash", "v1"), df)
+    snapshots.escribir(("hash", "v2"), df)
+    assert snapshots.leer(("hash", "v1")) is None
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["hash_v2.feather"]
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cubo import (
+    COL_Q13, COL_Q21, COL_Q31, COL_Q51, construir_cubo, distribucion, sumar_cubos, total_con_verbatim,
+    total_encuestas, tabla_dolor_por_mes, tabla_q21_por_nps, tabla_q31_por_mes, tabla_q51_por_mes,
+)
+from filtros_sidebar import filtrar_cubo, filtrar_filas
+
+
+def _encuestas(n=500, semilla=0):
+    """Dataset sintético con las columnas del cubo, nulos incluidos y algunas como categóricas."""
+    aleatorio = np.random.default_rng(semilla)
+
+    def elegir(opciones):
+        return aleatorio.choice(np.array(opciones, dtype=object), n)
+
+    df = pd.DataFrame({
+        "Mes": elegir(["2024-01", "2024-02", "2024-03", None]),
+        "Grupo NPS": elegir(["Promotor", "Pasivo", "Detractor", None]),
+        "Dolor": elegir(["Precio", "Facturación", "Sin Dolor Detectado", "Precio, Velocidad"]),
+        COL_Q21: elegir(["Precio", "Calidad", "Atención", None]),
+        COL_Q31: elegir(["Fácil", "Difícil", "Muy fácil", None]),
+        COL_Q51: elegir(["Sí", "No", None]),
+        COL_Q13: elegir(["anda bien", "", "-", "--", "  ", None, "caro"]),
+    })
+    for col in ("Mes", "Grupo NPS", "Dolor", COL_Q31):
+        df[col] = df[col].astype("category")
+    return df
+
+
+def crosstab(df, filas, columnas, relleno_filas=None, relleno_columnas=None):
+    """Lo que calculaban las vistas antes del cubo, sobre las filas."""
+    def etiquetas(serie, relleno):
+        serie = serie.astype(object)
+        return serie if relleno is None else serie.fillna(relleno)
+
+    tabla = pd.crosstab(etiquetas(df[filas], relleno_filas), etiquetas(df[columnas], relleno_columnas))
+    return tabla.sort_index().sort_index(axis=1)
+
+
+@pytest.mark.parametrize("tabla, filas, columnas, relleno_filas, relleno_columnas", [
+    (tabla_q21_por_nps, COL_Q21, "Grupo NPS", "Vacío", "Vacío"),
+    (tabla_dolor_por_mes, "Dolor", "Mes", "Sin Dolor Detectado", "Sin Fecha"),
+    (tabla_q31_por_mes, COL_Q31, "Mes", None, None),
+    (tabla_q51_por_mes, COL_Q51, "Mes", "Sin Respuesta", "Sin Fecha"),
+])
+def test_tablas_iguales_a_crosstab(tabla, filas, columnas, relleno_filas, relleno_columnas):
+    df = _encuestas()
+    resultado = tabla(construir_cubo(df))
+    esperado = crosstab(df, filas, columnas, relleno_filas, relleno_columnas)
+    pd.testing.assert_frame_equal(resultado, esperado, check_names=False, check_dtype=False,
+                                  check_index_type=False, check_column_type=False)
+
+
+def test_cubo_sumado_igual_al_del_total():
+    df = _encuestas(semilla=1)
+    partes = sumar_cubos(construir_cubo(df.iloc[:200]), construir_cubo(df.iloc[200:]))
+    pd.testing.assert_frame_equal(tabla_dolor_por_mes(partes), tabla_dolor_por_mes(construir_cubo(df)))
+
+
+def test_totales_y_distribucion():
+    df = _encuestas(semilla=2)
+    cubo = construir_cubo(df)
+    assert len(cubo) < len(df)
+    assert total_encuestas(cubo) == len(df)
+    con_verbatim = ~df[COL_Q13].fillna("").str.strip().isin(["", "-", "--"])
+    assert total_con_verbatim(cubo) == int(con_verbatim.sum())
+    esperado = df["Grupo NPS"].astype(object).fillna("Vacío").value_counts(normalize=True).mul(100).round(2)
+    pd.testing.assert_series_equal(distribucion(cubo, "Grupo NPS", "Vacío").sort_index(), esperado.sort_index(),
+                                   check_names=False, check_index_type=False)
+
+
+@pytest.mark.parametrize("selecciones", [
+    {"Mes": ["2024-02", "2024-03"]},
+    {"Grupo NPS": ["Detractor"], "Dolor": ["Precio"]},
+    {"Dolor": ["Velocidad", "Facturación"], COL_Q51: ["Sí"], COL_Q21: ["Precio", "Calidad"]},
+    {"Mes": ["2024-01"], COL_Q31: ["Difícil"], "Grupo NPS": ["No existe"]},
+])
+def test_cubo_filtrado_igual_al_de_las_filas_filtradas(selecciones):
+    df = _encuestas(semilla=3)
+    filtrado = filtrar_cubo(construir_cubo(df), selecciones)
+    desde_filas = construir_cubo(filtrar_filas(df, selecciones))
+    assert total_encuestas(filtrado) == total_encuestas(desde_filas)
+    for tabla in (tabla_q21_por_nps, tabla_dolor_por_mes, tabla_q31_por_mes, tabla_q51_por_mes):
+        pd.testing.assert_frame_equal(tabla(filtrado), tabla(desde_filas), check_dtype=False,
+                                      check_index_type=False, check_column_type=False)
+
+
+def test_filtrar_cubo_sin_la_dimension():
+    cubo = construir_cubo(_encuestas())
+    assert filtrar_cubo(cubo, {"Fecha": (pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-15"))}) is None
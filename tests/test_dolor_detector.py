@@ -0,0 +1,97 @@
+import random
+import re
+
+import pandas as pd
+import pytest
+
+from cache_clasificacion import CacheClasificacion
+from dolor_detector import _categoria_cacheada, detectar_dolores_batch
+from dolores_keywords import LEXICON, dolores
+from utils import (
+    contiene_clave_flexible, detector_compilado, expandir_sinonimos, normalizar_texto, preparar_textos,
+)
+
+
+def detectar_dolor_original(verbatim):
+    """La clasificación fila por fila tal como estaba antes del detector compilado."""
+    if not isinstance(verbatim, str) or not verbatim.strip():
+        return "Sin Dolor Detectado"
+    if not re.search(r"\b[a-zA-Z]{3,}\b", verbatim):
+        return "Sin Dolor Detectado"
+    verbatim_norm = expandir_sinonimos(normalizar_texto(verbatim))
+    for categoria, lista_frases in dolores.items():
+        if categoria in ["Indefinido", "Vacío"]:
+            continue
+        for frase_clave in lista_frases:
+            clave_norm = normalizar_texto(frase_clave)
+            if clave_norm and contiene_clave_flexible(verbatim_norm, clave_norm):
+                return categoria
+    return "Sin Dolor Detectado"
+
+
+def _corpus(n=600, semilla=0):
+    """Verbatims sintéticos: frases del léxico (a veces alteradas) mezcladas con ruido."""
+    aleatorio = random.Random(semilla)
+    frases = [frase for lista in dolores.values() for frase in lista]
+    ruido = ["muy", "bueno", "nada", "-", "...", "¡Pésimo!", "la", "ATENCION", "cobro", "valor",
+             "técnico", "soporte", "usuario", "ñandú", "123", "ok", "no", "anda", "lento", "😀", "de"]
+    textos = [None, "", " ", float("nan"), "nan", 123, "-", "ab", "atención", "atencion"]
+    for _ in range(n):
+        partes = []
+        for _ in range(aleatorio.randint(0, 6)):
+            if aleatorio.random() < 0.4:
+                frase = aleatorio.choice(frases)
+                if aleatorio.random() < 0.3:
+                    frase = frase.upper()
+                if aleatorio.random() < 0.2 and len(frase) > 3:
+                    i = aleatorio.randrange(len(frase))
+                    frase = frase[:i] + frase[i + 1:]
+                partes.append(frase)
+            else:
+                partes.append(aleatorio.choice(ruido))
+        textos.append(aleatorio.choice([" ", ", ", ". ", ""]).join(partes))
+    return textos
+
+
+@pytest.fixture(autouse=True)
+def cache_vacio():
+    _categoria_cacheada.cache_clear()
+    yield
+    _categoria_cacheada.cache_clear()
+
+
+def test_detector_compilado_igual_al_original():
+    # El detector recibe el texto ya validado (con al menos una palabra de 3 letras)
+    for texto in _corpus():
+        if not isinstance(texto, str) or not re.search(r"\b[a-zA-Z]{3,}\b", texto):
+            continue
+        categoria = detector_compilado.categoria(expandir_sinonimos(normalizar_texto(texto)))
+        assert (categoria or "Sin Dolor Detectado") == detectar_dolor_original(texto), texto
+
+
+def test_detectar_dolores_batch_igual_al_original():
+    # Textos repetidos y un índice que no empieza en 0, como después de filtrar
+    serie = pd.Series(_corpus() * 2, dtype=object)
+    serie.index = serie.index * 3 + 7
+    resultado = detectar_dolores_batch(serie)
+    pd.testing.assert_index_equal(resultado.index, serie.index)
+    assert resultado.tolist() == [detectar_dolor_original(texto) for texto in serie]
+
+
+
+def test_detectar_dolores_batch_con_texto_preparado():
+    col = "¿Cuál es el motivo de tu calificación?"
+    df = preparar_textos(pd.DataFrame({col: pd.Series(_corpus(semilla=1), dtype=object)}), [col])
+    resultado = detectar_dolores_batch(df[col], sinonimos=df[f"_{col}_sinonimos"])
+    assert resultado.tolist() == [detectar_dolor_original(texto) for texto in df[col]]
+
+
+def test_detectar_dolores_batch_con_cache_en_disco(tmp_path):
+    serie = pd.Series(_corpus(semilla=2), dtype=object)
+    esperado = [detectar_dolor_original(texto) for texto in serie]
+    cache_disco = CacheClasificacion(str(tmp_path / "clasificacion.sqlite"), LEXICON.version)
+    assert detectar_dolores_batch(serie, cache_disco).tolist() == esperado
+    # Segunda vez sin el cache en memoria: todo sale de SQLite
+    _categoria_cacheada.cache_clear()
+    assert detectar_dolores_batch(serie, cache_disco).tolist() == esperado
+    assert _categoria_cacheada.cache_info().currsize > 0
@@ -0,0 +1,37 @@
+import pandas as pd
+
+from data_loader import preparar_fechas, rango_fechas, meses_de_rango
+
+
+def _fechas(valores):
+    return preparar_fechas(pd.DataFrame({"Fecha": valores}))["Fecha"]
+
+
+def test_preparar_fechas_con_formatos_mezclados():
+    df = preparar_fechas(pd.DataFrame({
+        "Fecha": pd.Series(["2024-01-05 10:00", "2024-03-15", "no es fecha", None, pd.Timestamp("2024-02-01")], dtype=object),
+    }))
+    esperado = [pd.Timestamp("2024-01-05 10:00"), pd.Timestamp("2024-02-01"), pd.Timestamp("2024-03-15")]
+    assert df["Fecha"][:3].tolist() == esperado
+    assert df["Fecha"][3:].isna().all()
+    assert df["Mes"].tolist()[:3] == ["2024-01", "2024-02", "2024-03"]
+    assert df["Mes"][3:].isna().all()
+
+
+def test_rango_fechas_ignora_las_invalidas_al_final():
+    fechas = _fechas(["2024-01-31 23:59", "2024-01-01", "2024-02-01", None, "2024-02-15", "2024-03-01"])
+    assert rango_fechas(fechas, "2024-01-01", "2024-02-01") == (0, 2)
+    assert rango_fechas(fechas, "2024-02-01", "2024-03-01") == (2, 4)
+    assert rango_fechas(fechas, "2024-01-01", "2030-01-01") == (0, 5)
+    assert rango_fechas(fechas, "2025-01-01", "2026-01-01") == (5, 5)
+
+
+def test_meses_de_rango_sólo_con_meses_completos():
+    fechas = _fechas(["2024-01-10", "2024-01-20", "2024-02-05", "2024-03-07", None])
+    assert meses_de_rango(fechas, "2024-01-01", "2024-03-01") == ["2024-01", "2024-02"]
+    # El rango no deja afuera ninguna fila de enero ni de febrero aunque no empiece el 1°
+    assert meses_de_rango(fechas, "2024-01-05", "2024-02-10") == ["2024-01", "2024-02"]
+    # Corta enero a la mitad
+    assert meses_de_rango(fechas, "2024-01-15", "2024-03-01") is None
+    # Sin ordenar por fecha no se puede resolver por meses
+    assert meses_de_rango(fechas[::-1].reset_index(drop=True), "2024-01-01", "2024-03-01") is None
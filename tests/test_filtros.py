@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import preparar_fechas
+from filtros_sidebar import MotorFiltros, filtrar_filas
+
+COL_Q21 = "¿Cuál fue el factor que más influyó en tu nota?"
+COL_Q51 = "¿Te contactaste con nuestro centro de atención? Q5.1"
+
+
+def _encuestas(n=400, semilla=0, ordenar=True):
+    """Dataset sintético con las columnas de los filtros, nulos y dolores combinados."""
+    aleatorio = np.random.default_rng(semilla)
+
+    def elegir(opciones):
+        return aleatorio.choice(np.array(opciones, dtype=object), n)
+
+    df = pd.DataFrame({
+        "Fecha": pd.Timestamp("2024-01-01") + pd.to_timedelta(aleatorio.integers(0, 90 * 24, n), unit="h"),
+        "Grupo NPS": elegir(["Promotor", "Pasivo", "Detractor", None]),
+        "Dolor": elegir(["Precio", "Facturación", "Sin Dolor Detectado", "Precio, Velocidad", "Velocidad, Cobertura"]),
+        COL_Q21: elegir(["Precio", "Calidad", "Atención", None]),
+        COL_Q51: elegir(["Sí", "No", None]),
+    })
+    if ordenar:
+        df = preparar_fechas(df)
+    df["Grupo NPS"] = df["Grupo NPS"].astype("category")
+    return df
+
+
+def filtrar_paso_a_paso(df, selecciones):
+    """Un filtro detrás de otro sobre las filas, como aplicar_filtros antes del motor de bitmaps."""
+    for columna, seleccion in selecciones.items():
+        if columna == "Fecha":
+            inicio, fin = seleccion
+            df = df[(df["Fecha"] >= inicio) & (df["Fecha"] < fin)]
+        elif columna == "Dolor":
+            etiquetas = df["Dolor"].astype(object).map(lambda valor: {d.strip() for d in str(valor).split(",")})
+            df = df[etiquetas.map(lambda presentes: bool(presentes & set(seleccion)))]
+        else:
+            df = df[df[columna].isin(seleccion)]
+    return df.reset_index(drop=True)
+
+
+SELECCIONES = [
+    {},
+    {"Grupo NPS": ["Detractor", "Pasivo"]},
+    {"Dolor": ["Velocidad"]},
+    {"Dolor": ["Precio", "Cobertura"], COL_Q51: ["Sí"]},
+    {"Fecha": (pd.Timestamp("2024-01-15"), pd.Timestamp("2024-02-20")), "Grupo NPS": ["Promotor"], COL_Q21: ["Precio", "Calidad"]},
+    {"Mes": ["2024-02"], "Dolor": ["Facturación"]},
+    {"Grupo NPS": ["No existe"]},
+]
+
+
+@pytest.mark.parametrize("ordenar", [True, False])
+@pytest.mark.parametrize("selecciones", SELECCIONES)
+def test_filtrar_filas_igual_a_filtrar_paso_a_paso(selecciones, ordenar):
+    df = _encuestas(ordenar=ordenar)
+    if "Mes" in selecciones and "Mes" not in df.columns:
+        df["Mes"] = df["Fecha"].dt.strftime("%Y-%m")
+    pd.testing.assert_frame_equal(filtrar_filas(df, selecciones), filtrar_paso_a_paso(df, selecciones))
+
+
+def test_valores_presentes_son_los_de_las_filas_filtradas():
+    df = _encuestas(semilla=1)
+    motor = MotorFiltros(df)
+    mascara = motor.mascara_de("Grupo NPS", ["Detractor"])
+    filas = df[df["Grupo NPS"] == "Detractor"]
+    assert set(motor.valores_presentes(COL_Q21, mascara)) == set(filas[COL_Q21].dropna())
+    assert set(motor.valores_presentes("Dolor", mascara)) == {
+        d.strip() for valor in filas["Dolor"] for d in valor.split(",")
+    }
+    assert len(motor.materializar(df, mascara)) == len(filas)
@@ -0,0 +1,72 @@
+import io
+
+from openpyxl import Workbook
+
+from data_loader import _leer_hoja_encuesta, cargar_datos
+
+COL_Q13 = "¿Cuál es el motivo de tu calificación?"
+
+
+def _libro(hojas):
+    """Libro en memoria: {nombre de hoja: [encabezado, fila, ...]}, en ese orden."""
+    libro = Workbook()
+    libro.remove(libro.active)
+    for nombre, filas in hojas.items():
+        hoja = libro.create_sheet(nombre)
+        for fila in filas:
+            hoja.append(fila)
+    archivo = io.BytesIO()
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+
+def _auxiliar():
+    return [["Resumen", "Total"]] + [[f"fila {i}", i] for i in range(50)]
+
+
+def test_hoja_con_codigos_de_qualtrics_lee_sólo_las_columnas_necesarias():
+    archivo = _libro({
+        "Resumen": _auxiliar(),
+        "Encuesta": [
+            ["StartDate", "EndDate", "Q1.1_NPS_GROUP", "dni", "Q1.3", "Q1.2", "ResponseId", "Q6.1", "TECNOLOGIA_FLOW"],
+            ["2024-01-05", "2024-01-05 10:00", "Promotor", 123, "muy caro", 9, "R_1", "x", "FTTH"],
+            ["2024-01-06", "2024-01-06 11:00", "Detractor", 456, "no anda", 2, "R_2", "y", "HFC"],
+        ],
+    })
+    hoja = _leer_hoja_encuesta(archivo)
+    assert list(hoja.columns) == ["EndDate", "Q1.1_NPS_GROUP", "dni", "Q1.3", "Q1.2", "TECNOLOGIA_FLOW"]
+    assert hoja["Q1.3"].tolist() == ["muy caro", "no anda"]
+
+
+def test_hoja_con_preguntas_como_encabezado_se_lee_completa():
+    archivo = _libro({
+        "Encuesta": [
+            ["Fecha", "Grupo NPS", "DNI", COL_Q13, "Otra columna"],
+            ["2024-01-05 10:00", "Promotor", 123, "muy caro", "x"],
+        ],
+        "Resumen": _auxiliar(),
+    })
+    hoja = _leer_hoja_encuesta(archivo)
+    assert list(hoja.columns) == ["Fecha", "Grupo NPS", "DNI", COL_Q13, "Otra columna"]
+
+
+def test_cargar_datos_renombra_las_columnas_de_qualtrics():
+    archivo = _libro({
+        "Resumen": _auxiliar(),
+        "Encuesta": [
+            ["EndDate", "Q1.1_NPS_GROUP", "dni", "Q1.3", "ResponseId"],
+            ["2024-01-05 10:00", "Promotor", 123, "muy caro", "R_1"],
+            ["2024-01-06 11:00", "Detractor", 456, None, "R_2"],
+        ],
+    })
+    df = cargar_datos(archivo)
+    assert {"Fecha", "Grupo NPS", "DNI", COL_Q13, "verbatim"} <= set(df.columns)
+    assert "ResponseId" not in df.columns
+    # Las filas sin Q1.3 se descartan
+    assert df["DNI"].tolist() == [123]
+
+
+def test_libro_sin_hoja_de_encuesta():
+    assert _leer_hoja_encuesta(_libro({"Resumen": _auxiliar()})) is None
+    assert cargar_datos(_libro({"Resumen": _auxiliar()})) is None
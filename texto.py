@@ -0,0 +1,69 @@
+import unicodedata
+import re
+
+
+# 🧹 Conectores (stopwords) que se eliminarán al normalizar el texto
+conectores = {
+    "que", "y", "pero", "porque", "por", "para", "con",
+    "sin", "de", "la", "el", "en", "lo", "a", "un", "una",
+    "al", "del"
+    # Puedes agregar aquí cualquier palabra adicional que consideres “conector”
+}
+
+
+def normalizar_texto(texto):
+    """
+    1) Pasa a minúsculas
+    2) Quita tildes/acentos (texto ASCII básico)
+    3) Elimina signos de puntuación (reemplazándolos por espacio)
+    4) Divide en tokens y elimina las palabras que estén en 'conectores'
+    5) Devuelve la frase “limpia” unida por espacios
+    """
+    if not isinstance(texto, str):
+        return ""
+
+    # Pasar a minúsculas
+    texto = texto.lower()
+    # Quitar acentos/tildes
+    texto = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('utf-8')
+    # Reemplazar todo lo que no sea letra o dígito por espacio
+    texto = re.sub(r"[^\w\s]", " ", texto)
+    # Separar en tokens y filtrar conectores
+    tokens = [tok for tok in texto.split() if tok not in conectores]
+    # Reconstruir frase limpia
+    return " ".join(tokens)
+
+
+# Conectores como un único regex de palabra completa (para la versión vectorizada)
+_patron_conectores = re.compile(r"\b(?:" + "|".join(sorted(conectores)) + r")\b")
+
+
+def normalizar_serie(serie):
+    """
+    Versión vectorizada de 'normalizar_texto' para una columna completa.
+    Los valores que no son texto quedan como "" (igual que en la versión por fila).
+    """
+    serie = serie.astype(object)
+    texto = serie.where(serie.map(lambda x: isinstance(x, str)), "")
+    return (
+        texto.str.lower()
+        .str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('utf-8')
+        .str.replace(r"[^\w\s]", " ", regex=True)
+        .str.replace(_patron_conectores, " ", regex=True)
+        .str.split().str.join(" ")
+    )
+
+
+def normalizar_compacto(texto):
+    """
+    Normalización simple usada por dolor_detector: minúsculas, sin tildes
+    y sin signos de puntuación (se eliminan, no se reemplazan por espacio).
+    """
+    texto = str(texto).lower()
+    # Saca tildes/acentos
+    texto = ''.join(
+        c for c in unicodedata.normalize('NFD', texto)
+        if unicodedata.category(c) != 'Mn'
+    )
+    texto = re.sub(r'[^\w\s]', '', texto)  # Saca signos y puntuación
+    return texto.strip()
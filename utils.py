@@ -1,60 +1,70 @@
-import unicodedata
 import re
-from dolores_keywords import dolores
+import pandas as pd
+from dolores_keywords import LEXICON, CATEGORIAS_EXCLUIDAS, sinonimos
+from texto import normalizar_texto, normalizar_serie, conectores
+from instrumentacion import medido
 
 
-# 🔄 Diccionario de sinónimos (clave → lista de sinónimos que se normalizan a esa clave)
-sinonimos = {
-    "facturacion": ["factura", "boleta", "cobro"],
-    "precio":      ["valor", "costo"],
-    "servicio":    ["atencion", "soporte", "ayuda"],
-    "tecnico":     ["tecnica", "tecnologia"],
-    "pago":        ["abono", "deposito"],
-    "cliente":     ["usuario", "abonado"]
-}
+# Mapa inverso sinónimo → clave y un único regex compilado con todos los sinónimos.
+# Ninguna clave es a su vez sinónimo de otra, así que reemplazar todo en una sola
+# pasada da el mismo resultado que aplicar un re.sub por sinónimo.
+_sinonimo_a_clave = {sin: clave for clave, lista_sins in sinonimos.items() for sin in lista_sins}
+_patron_sinonimos = re.compile(
+    r"\b(" + "|".join(re.escape(sin) for sin in _sinonimo_a_clave) + r")\b"
+)
 
-# 🧹 Conectores (stopwords) que se eliminarán al normalizar el texto
-conectores = {
-    "que", "y", "pero", "porque", "por", "para", "con",
-    "sin", "de", "la", "el", "en", "lo", "a", "un", "una",
-    "al", "del"
-    # Puedes agregar aquí cualquier palabra adicional que consideres “conector”
-}
 
-
-def normalizar_texto(texto):
+def expandir_sinonimos(frase):
     """
-    1) Pasa a minúsculas
-    2) Quita tildes/acentos (texto ASCII básico)
-    3) Elimina signos de puntuación (reemplazándolos por espacio)
-    4) Divide en tokens y elimina las palabras que estén en 'conectores'
-    5) Devuelve la frase “limpia” unida por espacios
+    Reemplaza en la frase normalizada cada sinónimo por su clave.
+    Ejemplo: “cobro” → “facturacion”, “valor” → “precio”, etc.
     """
-    if not isinstance(texto, str):
-        return ""
+    # Coincidencia de palabra completa (\b...\b) contra todos los sinónimos a la vez
+    return _patron_sinonimos.sub(lambda m: _sinonimo_a_clave[m.group(1)], frase)
 
-    # Pasar a minúsculas
-    texto = texto.lower()
-    # Quitar acentos/tildes
-    texto = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('utf-8')
-    # Reemplazar todo lo que no sea letra o dígito por espacio
-    texto = re.sub(r"[^\w\s]", " ", texto)
-    # Separar en tokens y filtrar conectores
-    tokens = [tok for tok in texto.split() if tok not in conectores]
-    # Reconstruir frase limpia
-    return " ".join(tokens)
 
+def expandir_sinonimos_serie(serie):
+    """Versión vectorizada de 'expandir_sinonimos' sobre una columna ya normalizada."""
+    return serie.str.replace(_patron_sinonimos, lambda m: _sinonimo_a_clave[m.group(1)], regex=True)
 
-def expandir_sinonimos(frase):
+
+def columna_preparada(columna, tipo):
+    """Nombre de la columna interna con el texto preparado ("normalizado" o "sinonimos") de 'columna'."""
+    return f"_{columna}_{tipo}"
+
+
+@medido("preparar_textos")
+def preparar_textos(df, columnas):
     """
-    Reemplaza en la frase normalizada cada sinónimo por su clave.
-    Ejemplo: “cobro” → “facturacion”, “valor” → “precio”, etc.
+    Prepara una sola vez, al cargar, el texto de cada columna y lo guarda en
+    columnas internas (prefijo "_"):
+    - columna_preparada(col, "normalizado"): normalizar_texto (búsqueda por palabras clave).
+    - columna_preparada(col, "sinonimos"): además con sinónimos expandidos (clasificación).
+    Los tokens son el texto normalizado separado por espacios. Trabaja sobre los
+    valores distintos (los verbatims se repiten mucho) y los valores que no son
+    texto quedan como "".
     """
-    for clave, lista_sins in sinonimos.items():
-        for sin in lista_sins:
-            # Buscamos coincidencia de palabra completa (\b...\b)
-            frase = re.sub(rf"\b{re.escape(sin)}\b", clave, frase)
-    return frase
+    for col in columnas:
+        if col not in df.columns:
+            continue
+        codigos, unicos = pd.factorize(df[col].astype(object))
+        normalizados = normalizar_serie(pd.Series(unicos, dtype=object))
+        for tipo, valores in (("normalizado", normalizados), ("sinonimos", expandir_sinonimos_serie(normalizados))):
+            # El último elemento cubre los valores nulos (código -1 de factorize)
+            valores = pd.concat([valores, pd.Series([""])], ignore_index=True).to_numpy(dtype=object)
+            df[columna_preparada(col, tipo)] = pd.Series(valores[codigos], index=df.index, dtype=object)
+    return df
+
+
+def texto_preparado(df, columna, tipo):
+    """
+    Columna preparada por 'preparar_textos', o None si el dataset no pasó por
+    esa etapa (por ejemplo, un DataFrame armado a mano): ahí se normaliza como antes.
+    """
+    nombre = columna_preparada(columna, tipo)
+    if nombre not in df.columns:
+        return None
+    return df[nombre]
 
 
 def contiene_clave_flexible(frase_cliente, clave_normalizada):
@@ -71,33 +81,152 @@ def contiene_clave_flexible(frase_cliente, clave_normalizada):
         return bool(re.search(rf"\b{re.escape(clave_normalizada)}\b", frase_cliente))
 
 
+def _patron_trie(palabras):
+    """
+    Arma un regex con forma de trie a partir de 'palabras'.
+    En cada posición del texto el regex sigue un único camino del trie y,
+    por ser codicioso, devuelve la palabra más larga que empieza ahí.
+    """
+    trie = {}
+    for palabra in palabras:
+        nodo = trie
+        for caracter in palabra:
+            nodo = nodo.setdefault(caracter, {})
+        nodo[""] = True
+
+    def armar(nodo):
+        hijos = [re.escape(c) + armar(sub) for c, sub in sorted(nodo.items()) if c]
+        if not hijos:
+            return ""
+        cuerpo = hijos[0] if len(hijos) == 1 else "(?:" + "|".join(hijos) + ")"
+        # Si una palabra termina en este nodo, la continuación es opcional
+        return "(?:" + cuerpo + ")?" if "" in nodo else cuerpo
+
+    return re.compile("(?=(" + armar(trie) + "))")
+
+
+# Tope de tokens distintos memorizados por el detector (se vacía al alcanzarlo)
+_MAX_TOKENS_MEMO = 200_000
+
+
+class DetectorCompilado:
+    """
+    Motor de detección compilado una sola vez a partir del léxico de dolores.
+
+    Conserva la semántica de 'contiene_clave_flexible' y el orden de categorías:
+    - Claves de una palabra: deben coincidir con un token completo de la frase.
+    - Claves de varias palabras: cada token debe aparecer (como substring) en la frase.
+    Devuelve la primera categoría (en el orden del diccionario) con alguna clave presente.
+    """
+
+    def __init__(self, lexicon, excluir=CATEGORIAS_EXCLUIDAS):
+        self.categorias = []
+        # token → índice de la primera categoría con esa clave de una palabra
+        self._rango_palabra = {}
+        # (índice de categoría, tokens requeridos) para las claves de varias palabras
+        self._claves_multiples = []
+
+        for categoria in lexicon.categorias:
+            if categoria in excluir:
+                continue
+            rango = len(self.categorias)
+            self.categorias.append(categoria)
+            for clave in lexicon.claves[categoria]:
+                if len(clave.tokens) == 1:
+                    self._rango_palabra.setdefault(clave.tokens[0], rango)
+                elif clave.tokens:
+                    self._claves_multiples.append((rango, frozenset(clave.tokens)))
+
+        # Índice invertido token → claves que lo requieren (ordenadas por categoría)
+        self._claves_por_token = {}
+        for rango, tokens in self._claves_multiples:
+            for tok in tokens:
+                self._claves_por_token.setdefault(tok, []).append((rango, tokens))
+
+        # Un token presente implica que también lo están los tokens contenidos en él;
+        # así basta con quedarse con la coincidencia más larga en cada posición.
+        vocabulario = list(self._claves_por_token)
+        self._contenidos = {
+            tok: frozenset(otro for otro in vocabulario if otro in tok)
+            for tok in vocabulario
+        }
+        self._patron = _patron_trie(vocabulario)
+        # Memo por token del verbatim: (rango de clave de una palabra, tokens de claves contenidos)
+        self._por_token = {}
+
+    def __getstate__(self):
+        # El memo por token se reconstruye solo; no hace falta enviarlo a otros procesos
+        estado = self.__dict__.copy()
+        estado["_por_token"] = {}
+        return estado
+
+    def _analizar_token(self, tok):
+        """
+        Los tokens de las claves no tienen espacios, así que sólo pueden aparecer
+        dentro de un token del verbatim: basta con analizar cada token distinto una vez.
+        """
+        if len(self._por_token) >= _MAX_TOKENS_MEMO:
+            self._por_token.clear()
+        contenidos = frozenset().union(
+            *(self._contenidos[c.group(1)] for c in self._patron.finditer(tok))
+        )
+        info = (self._rango_palabra.get(tok, len(self.categorias)), contenidos)
+        self._por_token[tok] = info
+        return info
+
+    def categoria(self, frase):
+        """
+        Recibe la frase ya normalizada y con sinónimos expandidos.
+        Devuelve la categoría detectada o None si ninguna clave coincide.
+        """
+        mejor = len(self.categorias)
+        presentes = set()
+
+        for tok in frase.split():
+            rango, contenidos = self._por_token.get(tok) or self._analizar_token(tok)
+            if rango < mejor:
+                mejor = rango
+            presentes |= contenidos
+
+        for tok in presentes:
+            for rango, tokens in self._claves_por_token[tok]:
+                if rango >= mejor:
+                    break
+                if tokens <= presentes:
+                    mejor = rango
+                    break
+
+        return self.categorias[mejor] if mejor < len(self.categorias) else None
+
+
+# 🧠 Detector compilado una única vez al importar el módulo
+detector_compilado = DetectorCompilado(LEXICON)
+
+# Al menos 3 letras consecutivas para considerar que el texto es relevante
+patron_relevante = re.compile(r"\b[a-zA-Z]{3,}\b")
+
+
 def detectar_dolor(verbatim):
     """
     1) Validación inicial: retorna Sin Dolor Detectado si no hay texto relevante.
     2) Normaliza y expande sinónimos.
-    3) Recorre cada categoría en 'dolores' (salta "Indefinido" y "Vacío").
-    4) Por cada frase clave, si hay match flexible, devuelve la categoría.
-    5) Finalmente, si nada encaja, retorna "Sin Dolor Detectado".
+    3) Resuelve la categoría con el detector compilado (primera categoría de
+       'dolores' con alguna frase clave presente; salta "Indefinido" y "Vacío").
+    4) Finalmente, si nada encaja, retorna "Sin Dolor Detectado".
     """
     # 1) Verificar tipo y contenido básico
     if not isinstance(verbatim, str) or not verbatim.strip():
         return "Sin Dolor Detectado"
     # Exigir al menos 3 letras consecutivas (evita cadenas no relevantes)
-    if not re.search(r"\b[a-zA-Z]{3,}\b", verbatim):
+    if not patron_relevante.search(verbatim):
         return "Sin Dolor Detectado"
 
     # 2) Normalizar y expandir sinónimos
     verbatim_norm = normalizar_texto(verbatim)
     verbatim_norm = expandir_sinonimos(verbatim_norm)
 
-    # 3) Recorrer categorías principales
-    for categoria, lista_frases in dolores.items():
-        if categoria in ["Indefinido", "Vacío"]:
-            continue
-        for frase_clave in lista_frases:
-            clave_norm = normalizar_texto(frase_clave)
-            if clave_norm and contiene_clave_flexible(verbatim_norm, clave_norm):
-                return categoria
+    # 3) Resolver la categoría en una sola pasada
+    categoria = detector_compilado.categoria(verbatim_norm)
 
     # 4) Ninguna coincidencia: fallback
-    return "Sin Dolor Detectado"
+    return categoria if categoria is not None else "Sin Dolor Detectado"
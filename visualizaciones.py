@@ -1,11 +1,19 @@
 import streamlit as st
+import time
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
-from io import BytesIO
 from streamlit_echarts import st_echarts
-from utils import normalizar_texto
-from utils import detectar_dolor
+from utils import normalizar_texto, texto_preparado
+from exportacion import boton_descarga, huella_tabla
+from busqueda import IndiceBusqueda
+from filtros_sidebar import mascara_filtros
+from instrumentacion import medido
+from dolor_detector import estadisticas_cache_dolores
+from cubo import (
+    construir_cubo, total_encuestas as contar_encuestas, total_con_verbatim, distribucion,
+    tabla_q21_por_nps, tabla_dolor_por_mes, tabla_q31_por_mes, tabla_q51_por_mes,
+)
 
 try:
     from streamlit_echarts import st_echarts
@@ -13,8 +21,79 @@ except ImportError:
     st.warning("❌ No se pudo cargar 'streamlit_echarts'. Instalalo con: pip install streamlit-echarts")
     st_echarts = None
 
+def _filtrar_contacto(df, col_q52, col_q53, opcion_canal, opcion_resolucion):
+    """Filtros de canal (Q5.2) y resolución (Q5.3) de la sección de contacto, sobre las filas."""
+    if col_q52 in df.columns and opcion_canal != "Todos":
+        df = df[df[col_q52] == opcion_canal]
+    resuelto = df[col_q53].astype(str).str.strip()
+    if opcion_resolucion == "Sí":
+        df = df[resuelto.str.lower() == "sí"]
+    elif opcion_resolucion == "No":
+        df = df[resuelto.str.lower() == "no"]
+    elif opcion_resolucion == "Vacíos":
+        df = df[df[col_q53].isna() | (resuelto == "")]
+    return df
+
+# --- Tablas paginadas ---
+TAMANOS_PAGINA = [25, 50, 100, 500]
+_SIN_ORDEN = "(orden original)"
+
+
+def _orden_filas(tabla, columna, ascendente):
+    """Posiciones de las filas ordenadas por 'columna' (estable, nulos al final)."""
+    serie = tabla[columna].reset_index(drop=True)
+    try:
+        ordenada = serie.sort_values(ascending=ascendente, kind="stable", na_position="last")
+    except TypeError:
+        # Columnas con tipos mezclados (por ejemplo DNI numérico y texto): se ordenan como texto
+        ordenada = serie.astype(str).sort_values(ascending=ascendente, kind="stable")
+    return ordenada.index.to_numpy()
+
+
+def mostrar_paginado(tabla, clave, huella):
+    """
+    Muestra 'tabla' de a una página: sólo se serializa y se envía al navegador
+    la ventana visible. El orden elegido se calcula una vez por (huella, columna,
+    sentido) y se guarda en la sesión; al cambiar los datos se vuelve a la página 1.
+    """
+    total = len(tabla)
+    col1, col2, col3, col4 = st.columns([1, 3, 1, 1])
+    with col1:
+        tamano = st.selectbox("Filas por página", TAMANOS_PAGINA, key=f"tamano_{clave}")
+    with col2:
+        columna = st.selectbox("Ordenar por", [_SIN_ORDEN] + list(tabla.columns), key=f"orden_{clave}")
+    with col3:
+        ascendente = st.radio("Sentido", ["↑", "↓"], horizontal=True, key=f"sentido_{clave}") == "↑"
+
+    paginas = max(1, -(-total // tamano))
+    clave_pagina = f"pagina_{clave}"
+    if st.session_state.get(f"_huella_pagina_{clave}") != huella:
+        st.session_state[f"_huella_pagina_{clave}"] = huella
+        st.session_state[clave_pagina] = 1
+    elif st.session_state.get(clave_pagina, 1) > paginas:
+        st.session_state[clave_pagina] = paginas
+    with col4:
+        pagina = st.number_input("Página", min_value=1, max_value=paginas, step=1, key=clave_pagina)
+
+    inicio = (pagina - 1) * tamano
+    if columna == _SIN_ORDEN:
+        ventana = tabla.iloc[inicio:inicio + tamano]
+    else:
+        ordenes = st.session_state.setdefault("_ordenes_tablas", {})
+        clave_orden = (huella, columna, ascendente)
+        if ordenes.get(clave, (None,))[0] != clave_orden:
+            ordenes[clave] = (clave_orden, _orden_filas(tabla, columna, ascendente))
+        ventana = tabla.iloc[ordenes[clave][1][inicio:inicio + tamano]]
+
+    st.dataframe(ventana)
+    st.caption(f"Filas {min(inicio + 1, total)}–{min(inicio + tamano, total)} de {total} · página {pagina} de {paginas}")
+
+
 # --- Mostrar NPS General ---
-def mostrar_nps_general(df):
+# Las tablas de doble entrada y los indicadores salen del cubo de conteos ya
+# filtrado (cubo.py); si no se recibe, se arma a partir de df.
+@medido("mostrar_nps_general")
+def mostrar_nps_general(df, cubo=None):
     if df.empty:
         st.warning("⚠️ No hay datos para mostrar con los filtros actuales.")
         return
@@ -37,8 +116,11 @@ def mostrar_nps_general(df):
         st.error(f"❌ Faltan columnas necesarias en el archivo: {faltantes}")
         return
 
-    total_encuestas = df.shape[0]
-    verbatims = df[col_q13].fillna("").apply(lambda x: x.strip()).apply(lambda x: x if x not in ["", "-", "--", "-"] else None).dropna().shape[0]
+    if cubo is None:
+        cubo = construir_cubo(df)
+
+    total_encuestas = contar_encuestas(cubo)
+    verbatims = total_con_verbatim(cubo)
     vacios = total_encuestas - verbatims
 
     col1, col2, col3 = st.columns(3)
@@ -52,7 +134,7 @@ def mostrar_nps_general(df):
     st.divider()
 
     st.markdown("### 🧮 Distribución de Grupo NPS")
-    nps_counts = df[col_nps_group].fillna("Vacío").value_counts(normalize=True).mul(100).round(2)
+    nps_counts = distribucion(cubo, col_nps_group, "Vacío")
 
     prom = nps_counts.get("Promotor", 0.0)
     pas = nps_counts.get("Pasivo", 0.0)
@@ -84,37 +166,66 @@ def mostrar_nps_general(df):
     st.divider()
 
     st.markdown("### Q2.1 ¿Cuál fue el factor que más influyó en tu nota? por Grupo NPS")
-    tabla_q21 = pd.crosstab(df[col_q21].fillna("Vacío"), df[col_nps_group].fillna("Vacío"))
+    tabla_q21 = tabla_q21_por_nps(cubo)
     st.dataframe(tabla_q21)
     
 # ————————————————————————————————
     # Tabla de “Dolor” por Mes (todas las categorías)
-    if "Dolor" in df.columns and "Fecha" in df.columns:
-        df["Fecha_dt"] = pd.to_datetime(df["Fecha"], errors="coerce")
-        df["Mes"] = df["Fecha_dt"].dt.to_period("M").astype(str)
+    # "Mes" se calcula una sola vez al cargar (data_loader.preparar_fechas)
+    if "Dolor" in df.columns and "Mes" in df.columns:
 
-        tabla_dolor_mes = pd.crosstab(
-            df["Dolor"].fillna("Sin Dolor Detectado"),
-            df["Mes"].fillna("Sin Fecha")
-        )
+        tabla_dolor_mes = tabla_dolor_por_mes(cubo)
 
         st.markdown("### 📊 Q. de Dolor por Mes (todas las categorías)")
         st.dataframe(tabla_dolor_mes)
 
-        output_dolor = BytesIO()
-        tabla_dolor_mes.to_excel(output_dolor, index=True, engine='openpyxl')
-        st.download_button(
-            label="📥 Descargar tabla de Dolor por Mes (completa)",
-            data=output_dolor.getvalue(),
-            file_name="tabla_dolor_por_mes_completa.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        boton_descarga(
+            "dolor_mes",
+            lambda: tabla_dolor_mes,
+            etiqueta="📥 Descargar tabla de Dolor por Mes (completa)",
+            nombre_archivo="tabla_dolor_por_mes_completa",
+            huella=huella_tabla(df),
+            index=True,
+            hoja="Dolor por Mes"
         )
 # ————————————————————————————————
 
 
 
 # --- Tabla principal de verbatims ---
-def mostrar_tabla_general(df):
+def _indice_busqueda(df, columna, llave):
+    """
+    Índice invertido de la columna para la búsqueda por palabras clave. Se arma
+    una vez por 'llave' (no en cada tecla) y se guarda en la sesión.
+    """
+    guardado = st.session_state.get("_indice_busqueda")
+    if guardado is not None and guardado[0] == llave:
+        return guardado[1]
+    normalizados = texto_preparado(df, columna, "normalizado")
+    if normalizados is not None:
+        indice = IndiceBusqueda(normalizados)
+    else:
+        indice = IndiceBusqueda.desde_textos(df[columna])
+    st.session_state["_indice_busqueda"] = (llave, indice)
+    return indice
+
+
+def _buscar_verbatims(df, df_completo, columna, palabras, palabra_completa):
+    """
+    Filas de 'df' (ya filtrado) con alguna de las palabras. El índice se arma
+    una sola vez sobre el dataset completo y su resultado se cruza con la
+    máscara de los filtros: cambiar un filtro no lo reconstruye.
+    Sin el dataset completo (o sin su máscara) se indexan las filas filtradas.
+    """
+    filtro = mascara_filtros(df_completo) if df_completo is not None else None
+    if filtro is not None and int(filtro.sum()) == len(df):
+        llave = ("dataset", df_completo.attrs["clave_dataset"], columna)
+        return _indice_busqueda(df_completo, columna, llave).buscar(palabras, palabra_completa)[filtro]
+    return _indice_busqueda(df, columna, huella_tabla(df, columna)).buscar(palabras, palabra_completa)
+
+
+@medido("mostrar_tabla_general")
+def mostrar_tabla_general(df, cubo=None, df_completo=None):
     if df.empty:
         st.warning("⚠️ No hay datos para mostrar con los filtros actuales.")
         return
@@ -128,25 +239,16 @@ def mostrar_tabla_general(df):
     col_q31 = "¿Qué tan fácil te resulta usar Flow? Q3.1"
     col_q32 = "¿Nos contarías por qué motivo te resultó difícil? Q3.2"
 
-    # 1) Calcular columna 'Dolor' para el verbatim principal (Q1.3), si existe
-    if col_q13 in df.columns:
-        df["Dolor"] = df[col_q13].fillna("").astype(str).apply(detectar_dolor)
-    else:
-        df["Dolor"] = "Sin Dato"
+    # 1) 'Dolor' (Q1.3) y 'Dolor_Q3_2' ya vienen clasificados al procesar el archivo
 
     # 2) Lógica de búsqueda de palabras clave
     palabras_input = st.text_input("Buscar palabras clave (separadas por coma)", "")
+    palabra_completa = st.checkbox("Sólo palabras completas", value=False, key="busqueda_palabra_completa")
     palabras = [normalizar_texto(p.strip()) for p in palabras_input.split(",") if p.strip()]
 
-    df_filtrado = df.copy()
-    if palabras:
-        def contiene_palabras(texto):
-            texto_norm = normalizar_texto(str(texto))
-            return any(palabra in texto_norm for palabra in palabras)
-
-        df_filtrado = df_filtrado[
-            df_filtrado[col_q13].astype(str).apply(contiene_palabras)
-        ]
+    df_filtrado = df
+    if palabras and col_q13 in df.columns:
+        df_filtrado = df[_buscar_verbatims(df, df_completo, col_q13, palabras, palabra_completa)]
 
     # 3) Construir lista de columnas a mostrar
     columnas_base = ["Fecha", "Grupo NPS", "DNI", col_q13, "Dolor"]
@@ -158,34 +260,28 @@ def mostrar_tabla_general(df):
 
     # Si el usuario quiere todas las columnas, usamos df_filtrado completo; si no, solo columnas_base
     if incluir_todas:
-        tabla_export = df_filtrado.copy()
+        # Las columnas internas (prefijo "_") no se exportan
+        tabla_export = df_filtrado[[c for c in df_filtrado.columns if not c.startswith("_")]]
     else:
         tabla_export = df_filtrado[columnas_base]
 
-    # Mostrar la tabla en pantalla (solo columnas_base)
-    st.dataframe(df_filtrado[columnas_base])
+    # Mostrar la tabla en pantalla (solo columnas_base), paginada
+    mostrar_paginado(df_filtrado[columnas_base], "verbaitms", huella_tabla(df, palabras, palabra_completa))
 
     # Botón de descarga: exporta según selección del checkbox
-    output = BytesIO()
-    tabla_export.to_excel(output, index=False, engine='openpyxl')
-    st.download_button(
-        label="📥 Descargar tabla de verbatims",
-        data=output.getvalue(),
-        file_name="tabla_verbaitms_general.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        key="descargar_verbaitms"
+    boton_descarga(
+        "verbaitms",
+        lambda: tabla_export,
+        etiqueta="📥 Descargar tabla de verbatims",
+        nombre_archivo="tabla_verbaitms_general",
+        huella=huella_tabla(df, palabras, palabra_completa, incluir_todas),
+        hoja="Verbatims"
     )
 
 
     # ⬇️ Acá empieza la tabla adicional de Q3
     st.subheader("📋 Tabla **¿Qué tan fácil te resulta usar Flow?**")
 
-    # 3) Calcular columna 'Dolor_Q3_2' para el campo Q3.2, si existe
-    if col_q32 in df.columns:
-        df["Dolor_Q3_2"] = df[col_q32].fillna("").astype(str).apply(detectar_dolor)
-    else:
-        df["Dolor_Q3_2"] = "Sin Dato"
-
     # 4) Defino las columnas a mostrar/descargar para Q3 (sólo Dolor_Q3_2 y Q3.1)
     columnas_q3 = [
         "Fecha",
@@ -199,41 +295,39 @@ def mostrar_tabla_general(df):
     columnas_q3 = [col for col in columnas_q3 if col in df.columns]
 
     if columnas_q3:
-        st.dataframe(df[columnas_q3])
-
-        output_q3 = BytesIO()
-        df[columnas_q3].to_excel(output_q3, index=False, engine='openpyxl')
-        st.download_button(
-            label="📥 Descargar tabla de facilidad de uso (Q3.1/Q3.2)",
-            data=output_q3.getvalue(),
-            file_name="tabla_facilidad_q3.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            key="descargar_facilidad_q3"
+        mostrar_paginado(df[columnas_q3], "facilidad_q3", huella_tabla(df))
+
+        boton_descarga(
+            "facilidad_q3",
+            lambda: df[columnas_q3],
+            etiqueta="📥 Descargar tabla de facilidad de uso (Q3.1/Q3.2)",
+            nombre_archivo="tabla_facilidad_q3",
+            huella=huella_tabla(df),
+            hoja="Facilidad Q3"
         )
         
         # 5) Tabla de doble entrada: Frecuencia de Q3.1 por mes
-        if col_q31 in df.columns and "Fecha" in df.columns:
-            df["Fecha_dt"] = pd.to_datetime(df["Fecha"], errors="coerce")
-            df["Mes"] = df["Fecha_dt"].dt.strftime("%Y-%m")
-            pivot_q31 = pd.crosstab(df[col_q31], df["Mes"])
+        if col_q31 in df.columns and "Mes" in df.columns:
+            pivot_q31 = tabla_q31_por_mes(cubo if cubo is not None else construir_cubo(df))
             st.subheader("📊 ¿Qué tan fácil te resulta usar Flow? Q3.1 por Mes")
             st.dataframe(pivot_q31)
 
-            output_pivot = BytesIO()
-            pivot_q31.to_excel(output_pivot, engine='openpyxl')
-            st.download_button(
-                label="📥 Descargar tabla de Q3.1 por Mes",
-                data=output_pivot.getvalue(),
-                file_name="pivot_q3_1_por_mes.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                key="descargar_pivot_q3_1"
+            boton_descarga(
+                "pivot_q3_1",
+                lambda: pivot_q31,
+                etiqueta="📥 Descargar tabla de Q3.1 por Mes",
+                nombre_archivo="pivot_q3_1_por_mes",
+                huella=huella_tabla(df),
+                index=True,
+                hoja="Q3.1 por Mes"
             )
     else:
         st.info("ℹ️ Las columnas Q3.1, Q3.2 o Dolor_Q3_2 no están disponibles en este conjunto de datos.")
 
 
 # --- Mostrar Contacto y Resolución (sustituido por doble entrada Q5.1) ---
-def mostrar_contacto_y_resolucion(df):
+@medido("mostrar_contacto_y_resolucion")
+def mostrar_contacto_y_resolucion(df, cubo=None):
     df.columns = df.columns.str.strip()
     st.markdown("### 📊 ¿Te contactaste con nuestro centro de atención? Q5.1")
     st.markdown("###### Q5.1 por Mes (campos Q5.2 | CANAL, Q5.3 | Resuelto)")
@@ -244,13 +338,12 @@ def mostrar_contacto_y_resolucion(df):
     col_q53 = "¿Fue resuelto el motivo de tu contacto? Q5.3"
 
     # Verificar existencia de columnas necesarias
-    if col_q51 not in df.columns or col_q53 not in df.columns or "Fecha" not in df.columns:
+    if col_q51 not in df.columns or col_q53 not in df.columns or "Mes" not in df.columns:
         st.warning("⚠️ No se encontraron las columnas necesarias (Q5.1, Q5.3 o Fecha) en los datos.")
         return
 
-    # Convertir Fecha a datetime y extraer mes
-    df["Fecha_dt"] = pd.to_datetime(df["Fecha"], errors="coerce")
-    df["Mes"] = df["Fecha_dt"].dt.to_period("M").astype(str)
+    if cubo is None:
+        cubo = construir_cubo(df)
 
     # Creamos dos columnas para alinear los radio buttons lado a lado
     col1, col2 = st.columns(2)
@@ -276,43 +369,32 @@ def mostrar_contacto_y_resolucion(df):
             key="radio_q53"
         )
 
-    # Filtrar datos según selecciones
-    df_filtrado = df.copy()
-
-    # Aplicar filtro Q5.2
-    if col_q52 in df.columns and opcion_canal != "Todos":
-        df_filtrado = df_filtrado[df_filtrado[col_q52] == opcion_canal]
-    # Aplicar filtro Q5.3
-    if opcion_resolucion == "Sí":
-        df_filtrado = df_filtrado[df_filtrado[col_q53].astype(str).str.strip().str.lower() == "sí"]
-    elif opcion_resolucion == "No":
-        df_filtrado = df_filtrado[df_filtrado[col_q53].astype(str).str.strip().str.lower() == "no"]
-    elif opcion_resolucion == "Vacíos":
-        df_filtrado = df_filtrado[df_filtrado[col_q53].isna() | (df_filtrado[col_q53].astype(str).str.strip() == "")]
-    
-    # Crosstab: filas = categorías de Q5.1, columnas = Mes
-    tabla_crosstab = pd.crosstab(
-        df_filtrado[col_q51].fillna("Sin Respuesta"),
-        df_filtrado["Mes"].fillna("Sin Fecha")
-    )
+    # Tabla: filas = categorías de Q5.1, columnas = Mes. Q5.2 y Q5.3 no están en el cubo:
+    # con alguno de esos filtros se agregan las filas que quedan
+    if opcion_canal == "Todos" and opcion_resolucion == "Todos":
+        tabla_crosstab = tabla_q51_por_mes(cubo)
+    else:
+        tabla_crosstab = tabla_q51_por_mes(
+            construir_cubo(_filtrar_contacto(df, col_q52, col_q53, opcion_canal, opcion_resolucion))
+        )
 
-    
     st.dataframe(tabla_crosstab)
 
     # Botón para descargar el crosstab como Excel
-    output_ct = BytesIO()
-    tabla_crosstab.to_excel(output_ct, index=True, engine='openpyxl')
-    st.download_button(
-        label="📥 Descargar tabla de Q5.1 por mes",
-        data=output_ct.getvalue(),
-        file_name="tabla_q51_por_mes.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        key="descargar_q51_mes"
+    boton_descarga(
+        "q51_mes",
+        lambda: tabla_crosstab,
+        etiqueta="📥 Descargar tabla de Q5.1 por mes",
+        nombre_archivo="tabla_q51_por_mes",
+        huella=huella_tabla(df, opcion_canal, opcion_resolucion),
+        index=True,
+        hoja="Q5.1 por Mes"
     )
 
 
     
 # --- Mostrar precios y promociones (Q2.1, Q2.2, Q3.5) ---
+@medido("mostrar_precio_promociones")
 def mostrar_precio_promociones(df_filtrado, df_original, seleccion_grupo):
     st.subheader("🎯​ Tabla de Precio y Promociones")
     
@@ -330,18 +412,100 @@ def mostrar_precio_promociones(df_filtrado, df_original, seleccion_grupo):
         st.warning("⚠️ Las columnas necesarias no están disponibles en este conjunto de datos.")
         return
 
-    # Mostrar tabla basada en df_filtrado
-    st.dataframe(df_filtrado[columnas_existentes])
-
-    output = BytesIO()
-    df_filtrado[columnas_existentes].to_excel(output, index=False, engine='openpyxl')
-    st.download_button(
-        label="📥 Descargar tabla de precio/promociones",
-        data=output.getvalue(),
-        file_name="tabla_precio_promociones.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        key="descargar_tabla_precio"
+    # Mostrar tabla basada en df_filtrado, paginada
+    mostrar_paginado(df_filtrado[columnas_existentes], "tabla_precio", huella_tabla(df_filtrado))
+
+    boton_descarga(
+        "tabla_precio",
+        lambda: df_filtrado[columnas_existentes],
+        etiqueta="📥 Descargar tabla de precio/promociones",
+        nombre_archivo="tabla_precio_promociones",
+        huella=huella_tabla(df_filtrado),
+        hoja="Precio y Promociones"
     )
 
     st.divider()
     
+
+
+# --- Panel de rendimiento (barra lateral) ---
+def mostrar_panel_rendimiento(historial):
+    """
+    Desglose por etapa de la última ejecución del script (tiempo, filas de
+    entrada/salida y variación de memoria) y la evolución en la sesión.
+    """
+    if not historial:
+        return
+    ultima = historial[-1]
+    st.sidebar.markdown(f"**Última ejecución: {ultima.total:.2f} s**")
+    etapas = pd.DataFrame([medicion.como_dict() for medicion in ultima.etapas])
+    if not etapas.empty:
+        # Las etapas anidadas se muestran con sangría debajo de la que las contiene
+        etapas["etapa"] = etapas["nivel"].map(lambda nivel: "· " * nivel) + etapas["etapa"]
+        st.sidebar.dataframe(
+            etapas.drop(columns="nivel").round({"segundos": 3, "memoria_delta_mb": 1}),
+            hide_index=True
+        )
+
+    # Cache en memoria de la clasificación (acumulado del proceso, compartido por las sesiones)
+    cache = estadisticas_cache_dolores()
+    if cache.hits + cache.misses:
+        st.sidebar.caption(
+            f"Cache de clasificación: {cache.hits:,} hits / {cache.misses:,} misses "
+            f"({cache.hits / (cache.hits + cache.misses):.0%} de aciertos), "
+            f"{cache.currsize:,} de {cache.maxsize:,} textos"
+        )
+
+    if len(historial) > 1:
+        st.sidebar.markdown("**Historial de la sesión**")
+        evolucion = pd.DataFrame([
+            {
+                "ejecución": i,
+                "total": registro.total,
+                **{m.nombre: m.segundos for m in registro.etapas if m.nivel == 0},
+            }
+            for i, registro in enumerate(historial, start=1)
+        ]).set_index("ejecución")
+        st.sidebar.line_chart(evolucion["total"])
+        st.sidebar.dataframe(evolucion.round(3))
+
+    # Perfilado a pedido de una sola ejecución (cProfile + tracemalloc)
+    if st.session_state.get("_perfilado") == "esperando":
+        st.sidebar.info("🔬 La próxima interacción se va a perfilar.")
+    else:
+        st.sidebar.button("🔬 Perfilar la próxima interacción", on_click=armar_perfilado, key="armar_perfilado")
+
+
+def armar_perfilado():
+    st.session_state["_perfilado"] = "armado"
+
+
+def perfilar_esta_ejecucion():
+    """
+    El clic que arma el perfilado dispara su propia ejecución, que no interesa:
+    se perfila la siguiente (la interacción lenta que se quiere analizar).
+    """
+    estado = st.session_state.get("_perfilado")
+    if estado == "armado":
+        st.session_state["_perfilado"] = "esperando"
+    elif estado == "esperando":
+        st.session_state["_perfilado"] = None
+        return True
+    return False
+
+
+def mostrar_perfil(captura):
+    """Funciones y líneas con más asignaciones de la ejecución perfilada, con descargas."""
+    momento = time.strftime("%H:%M:%S", time.localtime(captura.inicio))
+    with st.expander(f"🔬 Perfil de la ejecución de las {momento} ({captura.segundos:.2f} s)"):
+        st.markdown("**Funciones con más tiempo acumulado**")
+        st.dataframe(captura.funciones.round({"tiempo_propio": 4, "tiempo_acumulado": 4}), hide_index=True)
+        st.markdown("**Líneas con más memoria asignada**")
+        st.dataframe(captura.asignaciones.round({"KB": 1}), hide_index=True)
+        col1, col2 = st.columns(2)
+        with col1, captura.archivo_pstats.abrir() as datos:
+            st.download_button("📥 Descargar perfil (.pstats)", data=datos, file_name="perfil.pstats",
+                               mime="application/octet-stream", key="descargar_pstats")
+        with col2, captura.archivo_snapshot.abrir() as datos:
+            st.download_button("📥 Descargar snapshot de memoria", data=datos, file_name="memoria.tracemalloc",
+                               mime="application/octet-stream", key="descargar_tracemalloc")